@@ -0,0 +1,18 @@
+"""
+Process-wide caches shared between routers.
+
+Rendered /api/home/stats bodies live here so the routers that change
+reading sessions can invalidate them without importing the home router.
+"""
+
+# period -> (day, expires_at, body). The day guards against serving last
+# month's figures across midnight; writers that change finished sessions
+# call invalidate_stats_cache() so the TTL only bounds staleness from other
+# title edits (category, word count).
+STATS_CACHE_TTL = 60  # seconds
+stats_cache: dict = {}
+
+
+def invalidate_stats_cache():
+    """Drop cached reading stats after sessions change."""
+    stats_cache.clear()
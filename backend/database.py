@@ -9,12 +9,43 @@ Schema: titles + editions (Phase 5 refactor)
 """
 
 import aiosqlite
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import AsyncGenerator
 
+# Request connections are pooled when aiosqlitepool is installed: each
+# aiosqlite connection is a worker thread plus an open file, so reusing
+# them skips that setup and keeps SQLite's page cache warm between
+# requests. Without it, get_db opens one connection per request.
+try:
+    from aiosqlitepool import SQLiteConnectionPool
+    AIOSQLITEPOOL_AVAILABLE = True
+except ImportError:
+    AIOSQLITEPOOL_AVAILABLE = False
+
 # Global database path (set during init)
 _db_path: str = None
 
+# Request connection pool (set during init when available)
+_pool = None
+DB_POOL_SIZE = 8
+
+# Prepared statements kept per connection (sqlite3's default is 128). A
+# pooled connection serves every router, and re-preparing an evicted
+# statement costs more than running a typical indexed lookup.
+DB_STATEMENT_CACHE_SIZE = 256
+
+# Per-connection tuning, applied once when a connection is opened. Journal
+# mode and synchronous stay at their defaults: backups copy the .db file,
+# which WAL would leave incomplete. mmap reads share the OS page cache
+# across the pool; cache_size is per connection (negative = KiB).
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA cache_size = -8192",
+    "PRAGMA mmap_size = 268435456",
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 def get_db_path() -> str:
     """
@@ -48,6 +79,21 @@ async def init_db(db_path: str) -> None:
         await run_migrations(db)
         
         print(f"Database initialized at {db_path}")
+    
+    global _pool
+    if AIOSQLITEPOOL_AVAILABLE:
+        _pool = SQLiteConnectionPool(_connect, pool_size=DB_POOL_SIZE)
+
+
+async def close_db() -> None:
+    """
+    Close pooled request connections.
+    Called once on application shutdown.
+    """
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
 
 
 async def run_migrations(db: aiosqlite.Connection) -> None:
@@ -478,6 +524,30 @@ async def run_titles_migrations(db: aiosqlite.Connection) -> None:
 
     await db.commit()  # Commit Phase 9C changes
 
+    # ==========================================================================
+    # Home page list indexes
+    # ==========================================================================
+    # Partial indexes over non-orphaned titles (the predicate must match the
+    # home.py queries verbatim). Each leads with the equality filters and ends
+    # with the ORDER BY column, so LIMIT reads a few index entries instead of
+    # sorting the table. Discover uses the quick-reads index prefix.
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_titles_home_in_progress
+        ON titles(status, acquisition_status, updated_at)
+        WHERE is_orphaned IS NULL OR is_orphaned = 0
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_titles_home_recent
+        ON titles(acquisition_status, created_at)
+        WHERE is_orphaned IS NULL OR is_orphaned = 0
+    """)
+    await db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_titles_home_quick_reads
+        ON titles(status, acquisition_status, word_count)
+        WHERE is_orphaned IS NULL OR is_orphaned = 0
+    """)
+    await db.commit()
+
     # Migration: Add enhanced metadata fields (Phase 7.0)
     enhanced_metadata_columns = [
         ("fandom", "TEXT"),
@@ -555,6 +625,28 @@ async def run_titles_migrations(db: aiosqlite.Connection) -> None:
     # Phase 9E: Smart Collections migration
     await run_smart_collections_migration(db)
 
+    # Migration: Backfill book_tags from titles.tags (triggers keep it in
+    # sync from here on)
+    cursor = await db.execute(
+        "SELECT value FROM settings WHERE key = 'book_tags_backfilled'"
+    )
+    if not await cursor.fetchone():
+        await db.execute("DELETE FROM book_tags")
+        cursor = await db.execute("""
+            INSERT OR IGNORE INTO book_tags (title_id, tag)
+            SELECT t.id, j.value
+            FROM titles t, json_each(t.tags) j
+            WHERE t.tags IS NOT NULL
+              AND json_valid(t.tags) AND json_type(t.tags) = 'array'
+              AND j.type = 'text'
+        """)
+        await db.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            ("book_tags_backfilled", "true")
+        )
+        await db.commit()
+        print(f"Migration: Backfilled {cursor.rowcount} book_tags rows")
+
     # ==========================================================================
     # Migration: Relabel file-backed editions by storage format (S15 Session 2)
     # ==========================================================================
@@ -681,10 +773,89 @@ async def get_db() -> AsyncGenerator[aiosqlite.Connection, None]:
         async def list_titles(db = Depends(get_db)):
             ...
     """
-    async with aiosqlite.connect(_db_path) as db:
-        db.row_factory = aiosqlite.Row  # Return dict-like rows
-        await db.execute("PRAGMA foreign_keys = ON")
+    if _pool is not None:
+        # Released connections are rolled back, so anything a request
+        # left uncommitted is discarded just as closing would
+        async with _pool.connection() as db:
+            yield db
+        return
+    
+    db = await _connect()
+    try:
         yield db
+    finally:
+        await db.close()
+
+
+async def _connect() -> aiosqlite.Connection:
+    """Open a request connection: dict-like rows, CONNECTION_PRAGMAS applied."""
+    db = await aiosqlite.connect(_db_path, cached_statements=DB_STATEMENT_CACHE_SIZE)
+    db.row_factory = aiosqlite.Row  # Return dict-like rows
+    for pragma in CONNECTION_PRAGMAS:
+        await db.execute(pragma)
+    return db
+
+
+async def qall(db: aiosqlite.Connection, sql: str, params=()) -> list:
+    """
+    Run a SELECT and return all rows in one round-trip.
+
+    aiosqlite's execute() + fetchall() costs two hops to the connection's
+    worker thread; execute_fetchall() does both in one.
+    """
+    return await db.execute_fetchall(sql, params)
+
+
+async def qone(db: aiosqlite.Connection, sql: str, params=()):
+    """
+    Run a SELECT and return the first row (or None) in one round-trip.
+    Intended for point lookups and aggregates that yield a single row.
+    """
+    rows = await db.execute_fetchall(sql, params)
+    return rows[0] if rows else None
+
+
+@asynccontextmanager
+async def transaction(db: aiosqlite.Connection) -> AsyncGenerator[aiosqlite.Connection, None]:
+    """
+    Run a block of writes as one BEGIN IMMEDIATE transaction.
+
+    The write lock is taken up front, so a concurrent writer can't make the
+    deferred read->write upgrade fail halfway through, and the whole block
+    commits (one fsync) on success or rolls back on any exception.
+
+        async with transaction(db):
+            await db.execute(...)
+            await db.execute(...)
+    """
+    await db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
+        raise
+    await db.commit()
+
+
+async def renumber_sessions(db, title_id: int, now: str):
+    """
+    Close gaps in a title's session_number sequence (1..N, in the existing
+    number order) after sessions are removed. Only rows whose number
+    changes are rewritten and stamped with now.
+
+    Runs inside the caller's transaction — the caller commits.
+    """
+    await db.execute("""
+        UPDATE reading_sessions
+        SET session_number = ranked.new_number, updated_at = ?
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY session_number) AS new_number
+            FROM reading_sessions
+            WHERE title_id = ?
+        ) AS ranked
+        WHERE reading_sessions.id = ranked.id
+          AND reading_sessions.session_number != ranked.new_number
+    """, (now, title_id))
 
 
 async def sync_title_from_sessions(db, title_id: int):
@@ -913,19 +1084,98 @@ CREATE TABLE IF NOT EXISTS collection_books (
     UNIQUE(collection_id, title_id)
 );
 
+-- One row per (title, tag), mirrored from titles.tags by the triggers below
+-- so tag filters can use an index instead of LIKE over the JSON text
+CREATE TABLE IF NOT EXISTS book_tags (
+    title_id INTEGER NOT NULL,
+    tag TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (title_id, tag),
+    FOREIGN KEY (title_id) REFERENCES titles(id) ON DELETE CASCADE
+);
+
+-- Single-row counter bumped by the triggers below whenever a title is
+-- added, removed or renamed; smart paste keys its cached title map on it
+CREATE TABLE IF NOT EXISTS titles_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO titles_version (id, version) VALUES (1, 0);
+
 -- Indexes for common queries
 CREATE INDEX IF NOT EXISTS idx_titles_category ON titles(category);
 CREATE INDEX IF NOT EXISTS idx_titles_series ON titles(series);
 CREATE INDEX IF NOT EXISTS idx_titles_title ON titles(title);
+-- Case-insensitive title lookups (WHERE LOWER(title) = ...) match this expression
+CREATE INDEX IF NOT EXISTS idx_titles_title_lower ON titles(lower(title));
 CREATE INDEX IF NOT EXISTS idx_titles_status ON titles(status);
 CREATE INDEX IF NOT EXISTS idx_titles_is_tbr ON titles(is_tbr);
+-- Smart paste's old (COUNT(*), MAX(updated_at)) cache signature;
+-- superseded by titles_version below
+DROP INDEX IF EXISTS idx_titles_updated_at;
 CREATE INDEX IF NOT EXISTS idx_editions_title_id ON editions(title_id);
 CREATE INDEX IF NOT EXISTS idx_editions_format ON editions(format);
 CREATE INDEX IF NOT EXISTS idx_notes_title_id ON notes(title_id);
 CREATE INDEX IF NOT EXISTS idx_links_to_title ON links(to_title_id);
 CREATE INDEX IF NOT EXISTS idx_links_from_note ON links(from_note_id);
-CREATE INDEX IF NOT EXISTS idx_reading_sessions_title_id ON reading_sessions(title_id);
+-- Walked backwards, this yields the projection order (date_started DESC,
+-- id DESC; NULLs last) for a title's sessions, so list_sessions and
+-- sync_title_from_sessions need no sort step (supersedes the
+-- single-column idx_reading_sessions_title_id)
+DROP INDEX IF EXISTS idx_reading_sessions_title_id;
+CREATE INDEX IF NOT EXISTS idx_reading_sessions_title_started ON reading_sessions(title_id, date_started);
+CREATE INDEX IF NOT EXISTS idx_reading_sessions_finished ON reading_sessions(session_status, date_finished);
 CREATE INDEX IF NOT EXISTS idx_collection_books_collection ON collection_books(collection_id);
 CREATE INDEX IF NOT EXISTS idx_collection_books_title ON collection_books(title_id);
-CREATE INDEX IF NOT EXISTS idx_collections_sort ON collections(sort_order);
+-- (collection_id, title_id) lookups use UNIQUE(collection_id, title_id)'s index
+CREATE INDEX IF NOT EXISTS idx_collection_books_position ON collection_books(collection_id, position);
+-- Matches list_collections' ORDER BY so the listing needs no sort step
+-- (supersedes the single-column idx_collections_sort)
+DROP INDEX IF EXISTS idx_collections_sort;
+CREATE INDEX IF NOT EXISTS idx_collections_sort_created ON collections(sort_order, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_book_tags_tag ON book_tags(tag);
+
+-- Keep book_tags in step with titles.tags (non-array or invalid JSON = no tags)
+CREATE TRIGGER IF NOT EXISTS trg_titles_tags_insert AFTER INSERT ON titles
+WHEN NEW.tags IS NOT NULL
+BEGIN
+    INSERT OR IGNORE INTO book_tags (title_id, tag)
+    SELECT NEW.id, value FROM json_each(
+        CASE WHEN json_valid(NEW.tags) AND json_type(NEW.tags) = 'array'
+             THEN NEW.tags ELSE '[]' END
+    ) WHERE type = 'text';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_titles_tags_update AFTER UPDATE OF tags ON titles
+BEGIN
+    DELETE FROM book_tags WHERE title_id = OLD.id;
+    INSERT OR IGNORE INTO book_tags (title_id, tag)
+    SELECT NEW.id, value FROM json_each(
+        CASE WHEN json_valid(NEW.tags) AND json_type(NEW.tags) = 'array'
+             THEN NEW.tags ELSE '[]' END
+    ) WHERE type = 'text';
+END;
+
+-- Covers connections that don't enable foreign_keys (no cascade there)
+CREATE TRIGGER IF NOT EXISTS trg_titles_tags_delete AFTER DELETE ON titles
+BEGIN
+    DELETE FROM book_tags WHERE title_id = OLD.id;
+END;
+
+-- Any write that changes the set of (id, title) pairs moves titles_version,
+-- however many happen within the same second
+CREATE TRIGGER IF NOT EXISTS trg_titles_version_insert AFTER INSERT ON titles
+BEGIN
+    UPDATE titles_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_titles_version_update AFTER UPDATE OF id, title ON titles
+WHEN OLD.id IS NOT NEW.id OR OLD.title IS NOT NEW.title
+BEGIN
+    UPDATE titles_version SET version = version + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_titles_version_delete AFTER DELETE ON titles
+BEGIN
+    UPDATE titles_version SET version = version + 1 WHERE id = 1;
+END;
 """
@@ -0,0 +1,14 @@
+"""
+Shared JSON response class for the list endpoints.
+
+Handlers that build plain dicts return JSONResponse directly, which skips
+FastAPI's response_model validation and jsonable_encoder pass; the
+response_model on the route is then documentation only. With orjson
+installed the body is rendered by ORJSONResponse; json is the fallback.
+"""
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as JSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse
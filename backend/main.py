@@ -16,7 +16,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 import aiosqlite
 
-from database import init_db, get_db, get_db_path
+from database import init_db, close_db, get_db, get_db_path
 from routers import titles, sync
 from services.backup import get_backup_settings, schedule_backup_jobs, start_scheduler
 from routers.upload import router as upload_router
@@ -93,7 +93,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Warning: Failed to start backup scheduler: {e}")
     
-    yield
+    try:
+        yield
+    finally:
+        # Pooled connections run on non-daemon threads; close them even if
+        # the app exits abnormally, or the process can't terminate
+        await close_db()
     
     # Shutdown: Stop backup scheduler
     if scheduler_started:
@@ -169,4 +174,4 @@ else:
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=3000)
+    uvicorn.run(app, host="0.0.0.0", port=3000, loop="uvloop", http="httptools")
@@ -19,41 +19,85 @@ Endpoints:
 import json
 import os
 import re
-import shutil
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, timedelta
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
 from typing import Optional, List
 from difflib import SequenceMatcher
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
-from database import get_db
+# C++ candidate pruning for smart paste's fuzzy match (difflib scores)
+try:
+    from rapidfuzz import fuzz, process as rf_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Faster parsing of the authors/auto_criteria JSON columns; json is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from database import get_db, qall, qone, transaction
 from services.covers import get_cover_style, Theme
+from routers.covers import cover_file_response, COVER_MEDIA_TYPES, ALLOWED_COVER_TYPES
 
 router = APIRouter(tags=["collections"])
 
+# Rows pulled per fetchmany() when scanning the whole titles table
+TITLE_FETCH_CHUNK = 256
+
+if ORJSON_AVAILABLE:
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+
+@lru_cache(maxsize=8192)
+def _cover_fields(title: str, author: str) -> tuple:
+    """(gradient, bg color, text color) for a title/author on the dark theme.
+    
+    get_cover_style's own cache still hashes the normalized key on every
+    call; this skips that for titles already seen.
+    """
+    style = get_cover_style(title, author, Theme.DARK)
+    return style.css_gradient, style.background_color, style.text_color
+
 
 def process_book_for_response(book_row) -> dict:
     """Process a book database row into API response format with cover styles."""
-    book = dict(book_row)
-    
     # Parse authors from JSON string to list
-    authors_raw = book.get("authors", "[]")
+    authors_raw = book_row["authors"]
     try:
-        authors = json.loads(authors_raw) if authors_raw else []
+        authors = _json_loads(authors_raw) if authors_raw else []
     except (json.JSONDecodeError, TypeError):
         authors = []
     
     primary_author = authors[0] if authors else "Unknown Author"
-    book["authors"] = authors
     
     # Generate cover style
-    cover_style = get_cover_style(book.get("title") or "Untitled", primary_author, Theme.DARK)
-    book["cover_gradient"] = cover_style.css_gradient
-    book["cover_bg_color"] = cover_style.background_color
-    book["cover_text_color"] = cover_style.text_color
+    gradient, bg_color, text_color = _cover_fields(
+        book_row["title"] or "Untitled", primary_author
+    )
     
-    return book
+    # Copy the row and add the response fields in one dict build
+    return {
+        **book_row,
+        "authors": authors,
+        "cover_gradient": gradient,
+        "cover_bg_color": bg_color,
+        "cover_text_color": text_color,
+    }
 
 
 # --------------------------------------------------------------------------
@@ -120,31 +164,38 @@ class AutoCriteriaPreview(BaseModel):
 async def list_collections(db=Depends(get_db)):
     """List all collections with book counts and preview books for mosaic covers."""
     
-    cursor = await db.execute('''
-        SELECT c.*, COUNT(cb.id) as book_count
+    # Correlated count (not JOIN + GROUP BY) so rows come straight off
+    # idx_collections_sort_created in display order
+    collections = await qall(db, '''
+        SELECT c.*,
+               (SELECT COUNT(*) FROM collection_books cb
+                WHERE cb.collection_id = c.id) as book_count
         FROM collections c
-        LEFT JOIN collection_books cb ON c.id = cb.collection_id
-        GROUP BY c.id
         ORDER BY c.sort_order ASC, c.created_at DESC
     ''')
-    collections = await cursor.fetchall()
-    
-    result = []
-    for c in collections:
-        coll = dict(c)
-        # Parse auto_criteria JSON if present - ensure it's always a dict
-        if coll.get('auto_criteria'):
-            try:
-                coll['auto_criteria'] = json.loads(coll['auto_criteria'])
-            except (json.JSONDecodeError, TypeError):
-                coll['auto_criteria'] = {}  # Fallback to empty dict on parse failure
+    
+    result = [dict(c) for c in collections]
+    automatic = []
+    for coll in result:
+        # Manual/checklist rows have no criteria and need no further work
+        if not coll['auto_criteria']:
+            continue
         
-        # For automatic collections, get dynamic book count
-        if coll.get('collection_type') == 'automatic' and coll.get('auto_criteria'):
-            count = await get_automatic_collection_count(coll['auto_criteria'], db)
-            coll['book_count'] = count
+        # Parse auto_criteria JSON - ensure it's always a dict
+        try:
+            coll['auto_criteria'] = _json_loads(coll['auto_criteria'])
+        except (json.JSONDecodeError, TypeError):
+            coll['auto_criteria'] = {}  # Fallback to empty dict on parse failure
         
-        result.append(coll)
+        # Automatic collections get a dynamic book count (filled in below)
+        if coll['collection_type'] == 'automatic' and coll['auto_criteria']:
+            automatic.append(coll)
+    
+    counts = await get_automatic_collection_counts(
+        [coll['auto_criteria'] for coll in automatic], db
+    )
+    for coll, count in zip(automatic, counts):
+        coll['book_count'] = count
     
     return result
 
@@ -161,20 +212,17 @@ async def create_collection(data: CollectionCreate, db=Depends(get_db)):
     if data.collection_type == 'automatic' and not data.auto_criteria:
         raise HTTPException(status_code=400, detail="Automatic collections require criteria")
     
-    # Get next sort_order
-    cursor = await db.execute('SELECT MAX(sort_order) FROM collections')
-    row = await cursor.fetchone()
-    next_order = (row[0] or 0) + 1
-    
     # Serialize auto_criteria to JSON
-    auto_criteria_json = json.dumps(data.auto_criteria) if data.auto_criteria else None
+    auto_criteria_json = _json_dumps(data.auto_criteria) if data.auto_criteria else None
     
+    # Next sort_order is computed in the INSERT itself
     cursor = await db.execute('''
         INSERT INTO collections (name, description, cover_type, cover_color_1, cover_color_2, 
                                  collection_type, auto_criteria, sort_order)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        SELECT ?, ?, ?, ?, ?, ?, ?, COALESCE(MAX(sort_order), 0) + 1
+        FROM collections
     ''', (data.name, data.description if data.description else None, data.cover_type, data.cover_color_1, data.cover_color_2,
-          data.collection_type, auto_criteria_json, next_order))
+          data.collection_type, auto_criteria_json))
     
     await db.commit()
     
@@ -202,8 +250,7 @@ async def get_collection(
     sections with separate pagination to avoid offset drift when books change status.
     """
     
-    cursor = await db.execute('SELECT * FROM collections WHERE id = ?', (collection_id,))
-    collection = await cursor.fetchone()
+    collection = await qone(db, 'SELECT * FROM collections WHERE id = ?', (collection_id,))
     
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -213,7 +260,7 @@ async def get_collection(
     # Parse auto_criteria - ensure it's always a dict
     if coll.get('auto_criteria'):
         try:
-            coll['auto_criteria'] = json.loads(coll['auto_criteria'])
+            coll['auto_criteria'] = _json_loads(coll['auto_criteria'])
         except (json.JSONDecodeError, TypeError):
             coll['auto_criteria'] = {}  # Fallback to empty dict on parse failure
     
@@ -241,24 +288,18 @@ async def get_collection(
         # CHECKLIST: Separate pagination for incomplete vs completed
         # This prevents pagination drift when books change status
         
-        # Count incomplete books
-        incomplete_count_cursor = await db.execute('''
-            SELECT COUNT(*) FROM collection_books cb
-            JOIN titles t ON cb.title_id = t.id
-            WHERE cb.collection_id = ? AND t.status != 'Finished'
-        ''', (collection_id,))
-        incomplete_total = (await incomplete_count_cursor.fetchone())[0]
-        
-        # Count completed books
-        completed_count_cursor = await db.execute('''
-            SELECT COUNT(*) FROM collection_books cb
+        # Count incomplete and completed books in one pass (a NULL status
+        # is in neither section, matching the page queries below)
+        incomplete_total, completed_total = await qone(db, '''
+            SELECT COALESCE(SUM(t.status != 'Finished'), 0),
+                   COALESCE(SUM(t.status = 'Finished'), 0)
+            FROM collection_books cb
             JOIN titles t ON cb.title_id = t.id
-            WHERE cb.collection_id = ? AND t.status = 'Finished'
+            WHERE cb.collection_id = ?
         ''', (collection_id,))
-        completed_total = (await completed_count_cursor.fetchone())[0]
         
         # Get incomplete books (sorted by position)
-        incomplete_cursor = await db.execute('''
+        incomplete_books = await qall(db, '''
             SELECT t.*, cb.position, cb.added_at as collection_added_at, cb.completed_at
             FROM collection_books cb
             JOIN titles t ON cb.title_id = t.id
@@ -266,10 +307,9 @@ async def get_collection(
             ORDER BY cb.position ASC
             LIMIT ? OFFSET ?
         ''', (collection_id, incomplete_limit, incomplete_offset))
-        incomplete_books = await incomplete_cursor.fetchall()
         
         # Get completed books (sorted by position)
-        completed_cursor = await db.execute('''
+        completed_books = await qall(db, '''
             SELECT t.*, cb.position, cb.added_at as collection_added_at, cb.completed_at
             FROM collection_books cb
             JOIN titles t ON cb.title_id = t.id
@@ -277,20 +317,10 @@ async def get_collection(
             ORDER BY cb.position ASC
             LIMIT ? OFFSET ?
         ''', (collection_id, completed_limit, completed_offset))
-        completed_books = await completed_cursor.fetchall()
         
-        # Process books
-        processed_incomplete = []
-        for b in incomplete_books:
-            book = process_book_for_response(b)
-            book['completed_at'] = b['completed_at']
-            processed_incomplete.append(book)
-        
-        processed_completed = []
-        for b in completed_books:
-            book = process_book_for_response(b)
-            book['completed_at'] = b['completed_at']
-            processed_completed.append(book)
+        # Process books (cb.completed_at is already one of the selected columns)
+        processed_incomplete = [process_book_for_response(b) for b in incomplete_books]
+        processed_completed = [process_book_for_response(b) for b in completed_books]
         
         total = incomplete_total + completed_total
         
@@ -314,12 +344,7 @@ async def get_collection(
     
     else:
         # MANUAL: Simple position-based pagination
-        count_cursor = await db.execute('''
-            SELECT COUNT(*) FROM collection_books WHERE collection_id = ?
-        ''', (collection_id,))
-        total = (await count_cursor.fetchone())[0]
-        
-        books_cursor = await db.execute('''
+        books = await qall(db, '''
             SELECT t.*, cb.position, cb.added_at as collection_added_at, cb.completed_at
             FROM collection_books cb
             JOIN titles t ON cb.title_id = t.id
@@ -327,19 +352,21 @@ async def get_collection(
             ORDER BY cb.position ASC
             LIMIT ? OFFSET ?
         ''', (collection_id, limit, offset))
-        books = await books_cursor.fetchall()
         
-        processed_books = []
-        for b in books:
-            book = process_book_for_response(b)
-            book['completed_at'] = b['completed_at']
-            processed_books.append(book)
+        # A short, non-empty (or first) page is the last one, so the total
+        # is already known; only count when there may be more rows
+        if len(books) < limit and (books or offset == 0):
+            total = offset + len(books)
+        else:
+            total = (await qone(db, '''
+                SELECT COUNT(*) FROM collection_books WHERE collection_id = ?
+            ''', (collection_id,)))[0]
         
         return {
             **coll,
             'book_count': total,
             'total_books': total,
-            'books': processed_books,
+            'books': [process_book_for_response(b) for b in books],
             'has_more': offset + len(books) < total
         }
 
@@ -349,8 +376,7 @@ async def update_collection(collection_id: int, data: CollectionUpdate, db=Depen
     """Update collection name, description, or cover settings."""
     
     # Verify collection exists
-    cursor = await db.execute('SELECT id, is_default, collection_type FROM collections WHERE id = ?', (collection_id,))
-    collection = await cursor.fetchone()
+    collection = await qone(db, 'SELECT id, is_default, collection_type FROM collections WHERE id = ?', (collection_id,))
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     
@@ -377,7 +403,7 @@ async def update_collection(collection_id: int, data: CollectionUpdate, db=Depen
     if data.auto_criteria is not None:
         if collection['collection_type'] == 'automatic' and not collection['is_default']:
             updates.append("auto_criteria = ?")
-            params.append(json.dumps(data.auto_criteria))
+            params.append(_json_dumps(data.auto_criteria))
     
     if updates:
         updates.append("updated_at = CURRENT_TIMESTAMP")
@@ -397,8 +423,7 @@ async def delete_collection(collection_id: int, db=Depends(get_db)):
     """Delete a collection (books are NOT deleted, just unlinked)."""
     
     # Verify collection exists and check if it's a default collection
-    cursor = await db.execute('SELECT id, is_default, name FROM collections WHERE id = ?', (collection_id,))
-    collection = await cursor.fetchone()
+    collection = await qone(db, 'SELECT id, is_default, name FROM collections WHERE id = ?', (collection_id,))
     
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -421,13 +446,12 @@ async def delete_collection(collection_id: int, db=Depends(get_db)):
 async def reorder_collections(data: CollectionReorder, db=Depends(get_db)):
     """Reorder collections list."""
     
-    for index, collection_id in enumerate(data.collection_ids):
-        await db.execute(
+    async with transaction(db):
+        await db.executemany(
             'UPDATE collections SET sort_order = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (index, collection_id)
+            [(index, collection_id) for index, collection_id in enumerate(data.collection_ids)]
         )
     
-    await db.commit()
     return {"message": "Collections reordered"}
 
 
@@ -439,12 +463,15 @@ async def reorder_collections(data: CollectionReorder, db=Depends(get_db)):
 async def add_books_to_collection(collection_id: int, data: CollectionBooksAdd, db=Depends(get_db)):
     """Add books to a collection (manual or checklist only)."""
     
-    # Verify collection exists and is not automatic
-    cursor = await db.execute(
-        'SELECT id, collection_type FROM collections WHERE id = ?', 
-        (collection_id,)
-    )
-    collection = await cursor.fetchone()
+    # Verify collection exists and is not automatic, and get the next
+    # free position in the same query
+    collection = await qone(db, '''
+        SELECT c.id, c.collection_type,
+               (SELECT COALESCE(MAX(position) + 1, 0) FROM collection_books
+                WHERE collection_id = c.id) AS next_position
+        FROM collections c
+        WHERE c.id = ?
+    ''', (collection_id,))
     
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -455,29 +482,21 @@ async def add_books_to_collection(collection_id: int, data: CollectionBooksAdd,
             detail="Cannot manually add books to automatic collections"
         )
     
-    # Get current max position
-    cursor = await db.execute(
-        'SELECT MAX(position) FROM collection_books WHERE collection_id = ?',
-        (collection_id,)
-    )
-    row = await cursor.fetchone()
-    next_position = (row[0] + 1) if row[0] is not None else 0
+    next_position = collection['next_position']
     
-    added = 0
-    for title_id in data.title_ids:
-        try:
-            await db.execute('''
-                INSERT INTO collection_books (collection_id, title_id, position)
-                VALUES (?, ?, ?)
-            ''', (collection_id, title_id, next_position))
-            next_position += 1
-            added += 1
-        except Exception as e:
-            # Skip duplicates (UNIQUE constraint)
-            if "UNIQUE constraint" not in str(e):
-                raise
+    rows = [
+        (collection_id, title_id, next_position + i)
+        for i, title_id in enumerate(data.title_ids)
+    ]
     
-    await db.commit()
+    # OR IGNORE skips books already in the collection (UNIQUE constraint);
+    # skipped rows leave gaps in position, which only needs to sort
+    async with transaction(db):
+        cursor = await db.executemany('''
+            INSERT OR IGNORE INTO collection_books (collection_id, title_id, position)
+            VALUES (?, ?, ?)
+        ''', rows)
+        added = cursor.rowcount
     
     return {"message": f"Added {added} books to collection"}
 
@@ -491,11 +510,11 @@ async def remove_book_from_collection(collection_id: int, title_id: int, db=Depe
     """
 
     # Verify collection exists and check type
-    cursor = await db.execute(
+    collection = await qone(
+        db,
         'SELECT id, collection_type FROM collections WHERE id = ?',
         (collection_id,)
     )
-    collection = await cursor.fetchone()
 
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -524,11 +543,11 @@ async def reorder_books_in_collection(collection_id: int, data: CollectionBooksR
     """Reorder books within a collection (manual or checklist only)."""
     
     # Verify collection exists and check type
-    cursor = await db.execute(
-        'SELECT id, collection_type FROM collections WHERE id = ?', 
+    collection = await qone(
+        db,
+        'SELECT id, collection_type FROM collections WHERE id = ?',
         (collection_id,)
     )
-    collection = await cursor.fetchone()
     
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -539,14 +558,12 @@ async def reorder_books_in_collection(collection_id: int, data: CollectionBooksR
             detail="Cannot reorder books in automatic collections"
         )
     
-    for index, title_id in enumerate(data.title_ids):
-        await db.execute('''
+    async with transaction(db):
+        await db.executemany('''
             UPDATE collection_books 
             SET position = ?
             WHERE collection_id = ? AND title_id = ?
-        ''', (index, collection_id, title_id))
-    
-    await db.commit()
+        ''', [(index, collection_id, title_id) for index, title_id in enumerate(data.title_ids)])
     
     return {"message": "Books reordered"}
 
@@ -564,12 +581,14 @@ async def mark_book_completed(
 ):
     """Mark a book as completed in a checklist collection."""
     
-    # Verify collection exists and is checklist type
-    cursor = await db.execute(
-        'SELECT id, collection_type FROM collections WHERE id = ?', 
-        (collection_id,)
-    )
-    collection = await cursor.fetchone()
+    # Verify collection exists, is checklist type, and contains the book
+    collection = await qone(db, '''
+        SELECT c.id, c.collection_type,
+               EXISTS(SELECT 1 FROM collection_books
+                      WHERE collection_id = c.id AND title_id = ?) AS in_collection
+        FROM collections c
+        WHERE c.id = ?
+    ''', (title_id, collection_id))
     
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -580,12 +599,7 @@ async def mark_book_completed(
             detail="Can only mark books complete in checklist collections"
         )
     
-    # Verify book is in collection
-    cursor = await db.execute(
-        'SELECT id FROM collection_books WHERE collection_id = ? AND title_id = ?',
-        (collection_id, title_id)
-    )
-    if not await cursor.fetchone():
+    if not collection['in_collection']:
         raise HTTPException(status_code=404, detail="Book not in collection")
     
     # Update completed_at
@@ -611,80 +625,137 @@ async def mark_book_completed(
 # Phase 9E: Automatic Collection Helpers
 # --------------------------------------------------------------------------
 
+# SQL for each criteria field
+_AUTO_CONDITIONS = {
+    'status': "t.status = ?",
+    # Match both new 'Abandoned' and legacy 'DNF' values
+    'status_abandoned': "(t.status = ? OR t.status = ?)",
+    'category': "t.category = ?",
+    'rating_min': "t.rating >= ?",
+    'finished_since': "t.date_finished >= ?",
+    'finished_between': "t.date_finished >= ? AND t.date_finished < ?",
+    'word_count_min': "t.word_count >= ?",
+    'word_count_max': "t.word_count <= ?",
+    # Tags are AND'd - book must have ALL selected tags. The tag list is
+    # bound as one JSON array so the SQL text doesn't vary with its length.
+    # The required count is the list's distinct size under NOCASE (ASCII-only
+    # folding), the same comparison IN applies to book_tags.tag.
+    'tags': (
+        "t.id IN (SELECT title_id FROM book_tags "
+        "WHERE tag IN (SELECT value FROM json_each(?)) "
+        "GROUP BY title_id HAVING COUNT(*) = "
+        "(SELECT COUNT(DISTINCT value COLLATE NOCASE) FROM json_each(?)))"
+    ),
+}
+
+
+@lru_cache(maxsize=128)
+def _auto_where_clause(shape: tuple) -> str:
+    """WHERE clause for a criteria shape (which fields are set, in order).
+    
+    Criteria that differ only in their values share a shape, so repeat
+    renders and previews reuse the same SQL string.
+    """
+    conditions = [_AUTO_CONDITIONS[field] for field in shape]
+    return " AND ".join(conditions) if conditions else "1=1"
+
+
+@lru_cache(maxsize=1)
+def _finished_bounds(today: date) -> dict:
+    """Parameters for each 'finished' option, computed once per day."""
+    return {
+        'this_month': [today.replace(day=1).isoformat()],
+        'last_30_days': [(today - timedelta(days=30)).isoformat()],
+        'this_year': [today.replace(month=1, day=1).isoformat()],
+        'last_year': [f'{today.year - 1}-01-01', f'{today.year}-01-01'],
+    }
+
+
 async def build_auto_criteria_query(criteria: dict) -> tuple:
     """Build SQL WHERE clause and params from auto criteria."""
-    conditions = []
+    shape = []
     params = []
     
     if criteria.get('status'):
         if criteria['status'] == 'Abandoned':
-            # Match both new 'Abandoned' and legacy 'DNF' values
-            conditions.append("(t.status = ? OR t.status = ?)")
+            shape.append('status_abandoned')
             params.extend(['Abandoned', 'DNF'])
         else:
-            conditions.append("t.status = ?")
+            shape.append('status')
             params.append(criteria['status'])
     
     if criteria.get('category'):
-        conditions.append("t.category = ?")
+        shape.append('category')
         params.append(criteria['category'])
     
     if criteria.get('rating_min'):
-        conditions.append("t.rating >= ?")
+        shape.append('rating_min')
         params.append(criteria['rating_min'])
     
     if criteria.get('finished'):
-        now = datetime.now()
-        if criteria['finished'] == 'this_month':
-            start = now.replace(day=1).strftime('%Y-%m-%d')
-            conditions.append("t.date_finished >= ?")
-            params.append(start)
-        elif criteria['finished'] == 'last_30_days':
-            start = (now - timedelta(days=30)).strftime('%Y-%m-%d')
-            conditions.append("t.date_finished >= ?")
-            params.append(start)
-        elif criteria['finished'] == 'this_year':
-            start = now.replace(month=1, day=1).strftime('%Y-%m-%d')
-            conditions.append("t.date_finished >= ?")
-            params.append(start)
-        elif criteria['finished'] == 'last_year':
-            last_year = now.year - 1
-            conditions.append("t.date_finished >= ? AND t.date_finished < ?")
-            params.extend([f'{last_year}-01-01', f'{now.year}-01-01'])
+        bounds = _finished_bounds(date.today()).get(criteria['finished'])
+        if bounds:
+            shape.append('finished_between' if len(bounds) == 2 else 'finished_since')
+            params.extend(bounds)
     
     if criteria.get('word_count_min'):
-        conditions.append("t.word_count >= ?")
+        shape.append('word_count_min')
         params.append(criteria['word_count_min'])
     
     if criteria.get('word_count_max'):
-        conditions.append("t.word_count <= ?")
+        shape.append('word_count_max')
         params.append(criteria['word_count_max'])
     
     if criteria.get('tags'):
-        # Tags are AND'd - book must have ALL selected tags
-        for tag in criteria['tags']:
-            # Tags stored as JSON array, use LIKE for simple matching
-            conditions.append("t.tags LIKE ?")
-            params.append(f'%"{tag}"%')
+        # Deduped in SQL: stored auto_criteria is free JSON, and Python's
+        # lower() folds more than NOCASE does
+        tags = _json_dumps(criteria['tags'])
+        shape.append('tags')
+        params.append(tags)
+        params.append(tags)
     
-    return conditions, params
+    return _auto_where_clause(tuple(shape)), params
 
 
 async def get_automatic_collection_count(criteria: dict, db) -> int:
     """Get count of books matching automatic collection criteria."""
-    conditions, params = await build_auto_criteria_query(criteria)
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    where_clause, params = await build_auto_criteria_query(criteria)
     
-    cursor = await db.execute(f'''
+    row = await qone(db, f'''
         SELECT COUNT(*) FROM titles t
         WHERE {where_clause}
     ''', params)
     
-    row = await cursor.fetchone()
     return row[0] if row else 0
 
 
+# Keep each UNION ALL well under SQLite's 500-term compound SELECT limit
+AUTO_COUNT_BATCH = 100
+
+
+async def get_automatic_collection_counts(criteria_list: list, db) -> list:
+    """Count books for several automatic collections in one query per batch.
+    
+    Each criteria set becomes one `SELECT <index>, COUNT(*)` arm of a
+    UNION ALL, so K collections cost one round-trip instead of K.
+    Returns counts in the same order as criteria_list.
+    """
+    counts = [0] * len(criteria_list)
+    
+    for start in range(0, len(criteria_list), AUTO_COUNT_BATCH):
+        arms = []
+        params = []
+        for i, criteria in enumerate(criteria_list[start:start + AUTO_COUNT_BATCH], start):
+            where_clause, arm_params = await build_auto_criteria_query(criteria)
+            arms.append(f"SELECT {i}, COUNT(*) FROM titles t WHERE {where_clause}")
+            params.extend(arm_params)
+        
+        for idx, count in await qall(db, " UNION ALL ".join(arms), params):
+            counts[idx] = count
+    
+    return counts
+
+
 async def get_automatic_collection_books(criteria: dict, limit: int, offset: int, db, sort_override: str = None) -> tuple:
     """Get books matching automatic collection criteria with pagination.
     
@@ -695,9 +766,7 @@ async def get_automatic_collection_books(criteria: dict, limit: int, offset: int
         db: Database connection
         sort_override: Optional sort that overrides criteria default
     """
-    conditions, params = await build_auto_criteria_query(criteria)
-    
-    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    where_clause, params = await build_auto_criteria_query(criteria)
     
     # Determine sort order - override takes precedence over criteria
     sort = sort_override or criteria.get('sort', 'title_asc')
@@ -717,21 +786,30 @@ async def get_automatic_collection_books(criteria: dict, limit: int, offset: int
         'added_asc': 'ORDER BY t.created_at ASC, t.title COLLATE NOCASE ASC',
     }.get(sort, 'ORDER BY t.title COLLATE NOCASE ASC')
     
-    # Get total count
-    count_cursor = await db.execute(f'''
-        SELECT COUNT(*) FROM titles t WHERE {where_clause}
-    ''', params)
-    total = (await count_cursor.fetchone())[0]
-    
-    # Get paginated books
-    cursor = await db.execute(f'''
-        SELECT t.* FROM titles t
+    # Get paginated books, with the total match count riding along on each
+    # row via a window function instead of a second COUNT query
+    rows = await qall(db, f'''
+        SELECT t.*, COUNT(*) OVER () AS total_matches FROM titles t
         WHERE {where_clause}
         {order_clause}
         LIMIT ? OFFSET ?
     ''', params + [limit, offset])
     
-    books = await cursor.fetchall()
+    if rows:
+        total = rows[0]['total_matches']
+    elif offset == 0:
+        total = 0
+    else:
+        # Page past the end - no row to read the total from
+        total = (await qone(db, f'''
+            SELECT COUNT(*) FROM titles t WHERE {where_clause}
+        ''', params))[0]
+    
+    books = []
+    for row in rows:
+        book = dict(row)
+        del book['total_matches']
+        books.append(book)
     
     return books, total
 
@@ -753,13 +831,152 @@ async def preview_automatic_criteria(data: AutoCriteriaPreview, db=Depends(get_d
 # Smart Paste
 # --------------------------------------------------------------------------
 
-@router.post("/collections/smart-paste/preview")
-async def smart_paste_preview(data: SmartPasteRequest, db=Depends(get_db)):
-    """Parse markdown with [[links]] and match to library books (collection-agnostic preview)."""
+# Minimum similarity (0-1) for a fuzzy smart-paste match
+FUZZY_MATCH_THRESHOLD = 0.8
+
+# [[Title]] links in pasted markdown
+_LINK_RE = re.compile(r'\[\[([^\]]+)\]\]')
+
+# Words used to shortlist fuzzy candidates
+_TOKEN_RE = re.compile(r'\w+')
+
+# Titles sharing the most words with an input that get fuzzy-scored
+FUZZY_SHORTLIST_SIZE = 50
+
+# Where a subtitle or series note starts: "Title: ...", "Title (...",
+# "Title [...", "Title - ..."
+_SUBTITLE_SEP_RE = re.compile(r'\s*(?:[:(\[]|\s[-\u2013\u2014]\s)')
+
+
+def _best_fuzzy_match(input_lower: str, title_keys: list) -> Optional[tuple]:
+    """Find the closest library title for an input with no exact match.
+    
+    Returns (title_key, ratio) for the highest-scoring key at or above
+    FUZZY_MATCH_THRESHOLD, or None. The score is always difflib's
+    Ratcliff/Obershelp ratio. rapidfuzz's fuzz.ratio (normalized Indel/LCS)
+    is a different measure that never scores lower, e.g. 0.70 vs 0.40 for
+    'the name of the wind' / 'the wind of the name', so when installed it
+    only prunes candidates that can't reach the threshold.
+    """
+    if RAPIDFUZZ_AVAILABLE:
+        # Keep the survivors in their original order so ties resolve
+        # exactly as in the plain difflib loop (the epsilon absorbs float
+        # rounding in a score sitting exactly on the threshold)
+        hits = rf_process.extract(
+            input_lower,
+            title_keys,
+            scorer=fuzz.ratio,
+            score_cutoff=FUZZY_MATCH_THRESHOLD * 100 - 1e-9,
+            limit=None
+        )
+        title_keys = [title_keys[index] for _, _, index in sorted(hits, key=lambda hit: hit[2])]
+    
+    # autojunk=False: the popular-character heuristic kicks in at 200 chars
+    # and would skew scores for long titles
+    sm = SequenceMatcher(None, input_lower, '', autojunk=False)
+    best_match = None
+    best_ratio = 0
+    for title_key in title_keys:
+        sm.set_seq2(title_key)
+        # Cheap upper bounds first; ratio() is the expensive DP
+        if sm.real_quick_ratio() < FUZZY_MATCH_THRESHOLD:
+            continue
+        if sm.quick_ratio() < FUZZY_MATCH_THRESHOLD:
+            continue
+        ratio = sm.ratio()
+        if ratio > best_ratio and ratio >= FUZZY_MATCH_THRESHOLD:
+            best_ratio = ratio
+            best_match = (title_key, ratio)
+            if ratio >= 0.99:
+                break
+    return best_match
+
+
+# Casefolded title -> (id, title), reused across smart-paste requests until
+# titles_version changes. Triggers on titles bump that counter on every
+# insert, delete and rename (database.py SCHEMA), including sync/import
+# writes, so no caller needs to invalidate explicitly.
+_title_map_cache = {"sig": None, "map": None, "lowers": None, "tokens": None, "sorted": None}
+
+
+async def _get_title_map(db) -> tuple:
+    """Return the title lookup structures, rebuilding only when titles changed.
+    
+    Keys: "map" (casefolded title -> (id, title)), "lowers" (its keys),
+    "tokens" (word -> keys containing it), "sorted" (keys, sorted).
+    """
+    sig = (await qone(db, "SELECT version FROM titles_version WHERE id = 1"))[0]
+    if _title_map_cache["sig"] == sig:
+        return _title_map_cache
+    
+    # Build the lookup map from the titles table a chunk at a time so only
+    # TITLE_FETCH_CHUNK Row objects are alive at once on large libraries
+    title_map = {}
+    cursor = await db.execute('SELECT id, title FROM titles')
+    while batch := await cursor.fetchmany(TITLE_FETCH_CHUNK):
+        for t in batch:
+            title_map[t['title'].casefold()] = (t['id'], t['title'])
+    title_keys = list(title_map)
+    
+    # word -> title keys containing it
+    token_index = {}
+    for key in title_keys:
+        for token in set(_TOKEN_RE.findall(key)):
+            token_index.setdefault(token, []).append(key)
+    
+    _title_map_cache.update(
+        sig=sig,
+        map=title_map,
+        lowers=title_keys,
+        tokens=token_index,
+        sorted=sorted(title_keys)
+    )
+    return _title_map_cache
+
+
+def _fuzzy_shortlist(input_lower: str, token_index: dict) -> list:
+    """Title keys sharing the most words with the input, best first."""
+    hits = Counter()
+    for token in set(_TOKEN_RE.findall(input_lower)):
+        hits.update(token_index.get(token, ()))
+    return [key for key, _ in hits.most_common(FUZZY_SHORTLIST_SIZE)]
+
+
+def _prefix_match(input_lower: str, title_map: dict, sorted_keys: list) -> Optional[str]:
+    """Match a title that differs from the input only by a trailing subtitle.
+    
+    Covers "Dune (Dune Chronicles #1)" -> "Dune" and, when exactly one title
+    qualifies, "Six of Crows" -> "Six of Crows: Book One". Only a subtitle
+    separator counts, so "It Ends With Us" never matches "It".
+    """
+    # Input is a library title plus a subtitle; prefer the longest title
+    for sep in reversed(list(_SUBTITLE_SEP_RE.finditer(input_lower))):
+        head = input_lower[:sep.start()]
+        if head in title_map:
+            return head
+    
+    # Input is the start of a library title (keys sharing a prefix are
+    # contiguous in sorted order)
+    hit = None
+    i = bisect_left(sorted_keys, input_lower)
+    while i < len(sorted_keys) and sorted_keys[i].startswith(input_lower):
+        if _SUBTITLE_SEP_RE.match(sorted_keys[i], len(input_lower)):
+            if hit:
+                return None  # Ambiguous - leave it to fuzzy matching
+            hit = sorted_keys[i]
+        i += 1
+    return hit
+
+
+async def _match_titles(markdown: str, db) -> dict:
+    """Extract [[links]] from markdown and match them to library titles.
+    
+    Exact (case-insensitive) matches win, then titles differing only by a
+    subtitle; anything else falls back to fuzzy matching. Shared by the preview and per-collection smart paste.
+    """
     
     # Extract [[links]] from markdown
-    pattern = r'\[\[([^\]]+)\]\]'
-    found_links = re.findall(pattern, data.markdown)
+    found_links = _LINK_RE.findall(markdown)
     
     if not found_links:
         return {
@@ -769,26 +986,20 @@ async def smart_paste_preview(data: SmartPasteRequest, db=Depends(get_db)):
             'total_unmatched': 0
         }
     
-    # Get all titles for matching
-    cursor = await db.execute('SELECT id, title FROM titles')
-    all_titles = await cursor.fetchall()
-    
-    # Create lookup map
-    title_map = {t['title'].lower(): (t['id'], t['title']) for t in all_titles}
+    library = await _get_title_map(db)
+    title_map = library["map"]
     
-    # Deduplicate while preserving order
-    seen = set()
-    unique_titles = []
+    # Deduplicate while preserving order, keyed by the casefolded form
+    # (casefold also folds non-ASCII case, e.g. 'ß' matches 'SS')
+    unique_titles = {}
     for t in found_links:
-        t_lower = t.lower().strip()
-        if t_lower not in seen:
-            seen.add(t_lower)
-            unique_titles.append(t.strip())
+        t = t.strip()
+        key = t.casefold()
+        if key and key not in unique_titles:
+            unique_titles[key] = t
     
     matches = []
-    for input_title in unique_titles:
-        input_lower = input_title.lower()
-        
+    for input_lower, input_title in unique_titles.items():
         # Try exact match first
         if input_lower in title_map:
             book_id, book_title = title_map[input_lower]
@@ -798,24 +1009,31 @@ async def smart_paste_preview(data: SmartPasteRequest, db=Depends(get_db)):
                 'matched_title': book_title,
                 'confidence': 'exact'
             })
+        elif prefix_key := _prefix_match(input_lower, title_map, library["sorted"]):
+            book_id, book_title = title_map[prefix_key]
+            matches.append({
+                'input_title': input_title,
+                'matched_title_id': book_id,
+                'matched_title': book_title,
+                'confidence': 'prefix'
+            })
         else:
             # Try fuzzy match
-            best_match = None
-            best_ratio = 0
-            
-            for book_title_lower, (book_id, book_title) in title_map.items():
-                ratio = SequenceMatcher(None, input_lower, book_title_lower).ratio()
-                if ratio > best_ratio and ratio >= 0.8:  # 80% similarity threshold
-                    best_ratio = ratio
-                    best_match = (book_id, book_title, ratio)
+            # Score titles that share a word first; scan the whole library
+            # only when none of those is close enough (e.g. misspellings)
+            shortlist = _fuzzy_shortlist(input_lower, library["tokens"])
+            best_match = shortlist and _best_fuzzy_match(input_lower, shortlist)
+            if not best_match:
+                best_match = _best_fuzzy_match(input_lower, library["lowers"])
             
             if best_match:
+                book_id, book_title = title_map[best_match[0]]
                 matches.append({
                     'input_title': input_title,
-                    'matched_title_id': best_match[0],
-                    'matched_title': best_match[1],
+                    'matched_title_id': book_id,
+                    'matched_title': book_title,
                     'confidence': 'fuzzy',
-                    'similarity': round(best_match[2] * 100)
+                    'similarity': round(best_match[1] * 100)
                 })
             else:
                 matches.append({
@@ -835,16 +1053,22 @@ async def smart_paste_preview(data: SmartPasteRequest, db=Depends(get_db)):
     }
 
 
+@router.post("/collections/smart-paste/preview")
+async def smart_paste_preview(data: SmartPasteRequest, db=Depends(get_db)):
+    """Parse markdown with [[links]] and match to library books (collection-agnostic preview)."""
+    return await _match_titles(data.markdown, db)
+
+
 @router.post("/collections/{collection_id}/smart-paste")
 async def smart_paste_parse(collection_id: int, data: SmartPasteRequest, db=Depends(get_db)):
     """Parse markdown with [[links]] and match to library books."""
     
     # Verify collection exists and is not automatic
-    cursor = await db.execute(
-        'SELECT id, collection_type FROM collections WHERE id = ?', 
+    collection = await qone(
+        db,
+        'SELECT id, collection_type FROM collections WHERE id = ?',
         (collection_id,)
     )
-    collection = await cursor.fetchone()
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     
@@ -854,82 +1078,7 @@ async def smart_paste_parse(collection_id: int, data: SmartPasteRequest, db=Depe
             detail="Cannot use smart paste with automatic collections"
         )
     
-    # Extract [[links]] from markdown
-    pattern = r'\[\[([^\]]+)\]\]'
-    matches = re.findall(pattern, data.markdown)
-    
-    if not matches:
-        return {
-            'matches': [],
-            'total_found': 0,
-            'total_matched': 0,
-            'total_unmatched': 0
-        }
-    
-    # Get all titles for matching
-    cursor = await db.execute('SELECT id, title FROM titles')
-    all_titles = await cursor.fetchall()
-    
-    # Create lookup map
-    title_map = {t['title'].lower(): (t['id'], t['title']) for t in all_titles}
-    
-    # Deduplicate while preserving order
-    seen = set()
-    unique_titles = []
-    for t in matches:
-        t_lower = t.lower().strip()
-        if t_lower not in seen:
-            seen.add(t_lower)
-            unique_titles.append(t.strip())
-    
-    matches = []
-    for input_title in unique_titles:
-        input_lower = input_title.lower()
-        
-        # Try exact match first
-        if input_lower in title_map:
-            book_id, book_title = title_map[input_lower]
-            matches.append({
-                'input_title': input_title,
-                'matched_title_id': book_id,
-                'matched_title': book_title,
-                'confidence': 'exact'
-            })
-        else:
-            # Try fuzzy match
-            best_match = None
-            best_ratio = 0
-            
-            for book_title_lower, (book_id, book_title) in title_map.items():
-                ratio = SequenceMatcher(None, input_lower, book_title_lower).ratio()
-                if ratio > best_ratio and ratio >= 0.8:  # 80% similarity threshold
-                    best_ratio = ratio
-                    best_match = (book_id, book_title, ratio)
-            
-            if best_match:
-                matches.append({
-                    'input_title': input_title,
-                    'matched_title_id': best_match[0],
-                    'matched_title': best_match[1],
-                    'confidence': 'fuzzy',
-                    'similarity': round(best_match[2] * 100)
-                })
-            else:
-                matches.append({
-                    'input_title': input_title,
-                    'matched_title_id': None,
-                    'matched_title': None,
-                    'confidence': 'none'
-                })
-    
-    matched_count = sum(1 for m in matches if m['matched_title_id'] is not None)
-    
-    return {
-        'matches': matches,
-        'total_found': len(matches),
-        'total_matched': matched_count,
-        'total_unmatched': len(matches) - matched_count
-    }
+    return await _match_titles(data.markdown, db)
 
 
 @router.post("/collections/{collection_id}/smart-paste/apply")
@@ -946,7 +1095,7 @@ async def smart_paste_apply(collection_id: int, data: CollectionBooksAdd, db=Dep
 async def get_collections_for_book(title_id: int, db=Depends(get_db)):
     """Get all collections a book belongs to (manual and checklist only)."""
     
-    cursor = await db.execute('''
+    collections = await qall(db, '''
         SELECT c.id, c.name, c.cover_type, c.cover_color_1, c.cover_color_2, 
                c.collection_type, cb.completed_at
         FROM collections c
@@ -954,8 +1103,6 @@ async def get_collections_for_book(title_id: int, db=Depends(get_db)):
         WHERE cb.title_id = ?
         ORDER BY c.name
     ''', (title_id,))
-    
-    collections = await cursor.fetchall()
     return [dict(c) for c in collections]
 
 
@@ -976,8 +1123,7 @@ async def list_all_collections_simple(
     
     query += " ORDER BY sort_order ASC, name ASC"
     
-    cursor = await db.execute(query)
-    collections = await cursor.fetchall()
+    collections = await qall(db, query)
     
     return [dict(c) for c in collections]
 
@@ -1001,8 +1147,7 @@ async def duplicate_collection(
     """Duplicate a collection, optionally with a different type."""
     
     # Get source collection
-    cursor = await db.execute('SELECT * FROM collections WHERE id = ?', (collection_id,))
-    source = await cursor.fetchone()
+    source = await qone(db, 'SELECT * FROM collections WHERE id = ?', (collection_id,))
     
     if not source:
         raise HTTPException(status_code=404, detail="Collection not found")
@@ -1016,48 +1161,43 @@ async def duplicate_collection(
     if data.collection_type == 'automatic' and not data.auto_criteria:
         # Copy source criteria if available, otherwise error
         if source.get('auto_criteria'):
-            data.auto_criteria = json.loads(source['auto_criteria'])
+            data.auto_criteria = _json_loads(source['auto_criteria'])
         else:
             raise HTTPException(
                 status_code=400, 
                 detail="Automatic collections require criteria"
             )
     
-    # Get next sort_order
-    cursor = await db.execute('SELECT MAX(sort_order) FROM collections')
-    row = await cursor.fetchone()
-    next_order = (row[0] or 0) + 1
-    
-    # Create duplicate
-    auto_criteria_json = json.dumps(data.auto_criteria) if data.auto_criteria else None
-    
-    cursor = await db.execute('''
-        INSERT INTO collections (name, description, cover_type, cover_color_1, cover_color_2,
-                                 collection_type, auto_criteria, sort_order)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        data.name,
-        source.get('description'),
-        source.get('cover_type', 'gradient'),
-        source.get('cover_color_1'),
-        source.get('cover_color_2'),
-        data.collection_type,
-        auto_criteria_json,
-        next_order
-    ))
-    
-    new_id = cursor.lastrowid
-    
-    # If target is manual or checklist, copy books from source
-    if data.collection_type in ('manual', 'checklist') and source['collection_type'] != 'automatic':
-        await db.execute('''
-            INSERT INTO collection_books (collection_id, title_id, position)
-            SELECT ?, title_id, position
-            FROM collection_books
-            WHERE collection_id = ?
-        ''', (new_id, collection_id))
-    
-    await db.commit()
+    # Create duplicate (placed after every existing collection)
+    auto_criteria_json = _json_dumps(data.auto_criteria) if data.auto_criteria else None
+    
+    # Collection row and its books land together or not at all
+    async with transaction(db):
+        cursor = await db.execute('''
+            INSERT INTO collections (name, description, cover_type, cover_color_1, cover_color_2,
+                                     collection_type, auto_criteria, sort_order)
+            SELECT ?, ?, ?, ?, ?, ?, ?, COALESCE(MAX(sort_order), 0) + 1
+            FROM collections
+        ''', (
+            data.name,
+            source.get('description'),
+            source.get('cover_type', 'gradient'),
+            source.get('cover_color_1'),
+            source.get('cover_color_2'),
+            data.collection_type,
+            auto_criteria_json
+        ))
+        
+        new_id = cursor.lastrowid
+        
+        # If target is manual or checklist, copy books from source
+        if data.collection_type in ('manual', 'checklist') and source['collection_type'] != 'automatic':
+            await db.execute('''
+                INSERT INTO collection_books (collection_id, title_id, position)
+                SELECT ?, title_id, position
+                FROM collection_books
+                WHERE collection_id = ?
+            ''', (new_id, collection_id))
     
     return {"id": new_id, "message": "Collection duplicated"}
 
@@ -1068,78 +1208,113 @@ async def duplicate_collection(
 
 COVERS_DIR = os.environ.get("COVERS_DIR", "/data/covers")
 
+# Same limit as book covers
+MAX_COVER_SIZE = 10 * 1024 * 1024  # 10MB
+COVER_COPY_CHUNK = 1024 * 1024
+
+
+def _looks_like_image(head: bytes) -> bool:
+    """Check the leading bytes for a JPEG, PNG, GIF or WebP signature."""
+    return (
+        head.startswith(b'\xff\xd8\xff')
+        or head.startswith(b'\x89PNG\r\n\x1a\n')
+        or head[:6] in (b'GIF87a', b'GIF89a')
+        or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+    )
+
+
+def _save_cover_upload(src, filepath: str) -> None:
+    """Copy an uploaded file to disk in chunks (blocking; run in a thread).
+    
+    Raises ValueError, leaving no partial file, once MAX_COVER_SIZE is exceeded.
+    """
+    written = 0
+    with open(filepath, "wb") as buffer:
+        while chunk := src.read(COVER_COPY_CHUNK):
+            written += len(chunk)
+            if written > MAX_COVER_SIZE:
+                break
+            buffer.write(chunk)
+    if written > MAX_COVER_SIZE:
+        os.remove(filepath)
+        raise ValueError("File too large. Max 10MB")
+
+
+def _remove_cover_file(path: Optional[str]) -> None:
+    """Best-effort delete of an old cover file (blocking; run as a background task)."""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
 
 @router.get("/collections/{id}/cover")
-async def get_collection_cover(id: int, db=Depends(get_db)):
+async def get_collection_cover(id: int, request: Request, db=Depends(get_db)):
     """Serve collection cover image."""
-    from fastapi.responses import FileResponse
     
-    cursor = await db.execute(
+    collection = await qone(
+        db,
         "SELECT custom_cover_path FROM collections WHERE id = ?", 
         [id]
     )
-    collection = await cursor.fetchone()
     
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     
     cover_path = collection["custom_cover_path"]
-    if not cover_path or not os.path.exists(cover_path):
+    if not cover_path:
         raise HTTPException(status_code=404, detail="Cover not found")
     
     # Determine media type from extension
-    ext = os.path.splitext(cover_path)[1].lower()
-    media_types = {
-        ".jpg": "image/jpeg",
-        ".jpeg": "image/jpeg", 
-        ".png": "image/png",
-        ".webp": "image/webp",
-        ".gif": "image/gif"
-    }
-    media_type = media_types.get(ext, "image/jpeg")
+    ext = cover_path.rpartition(".")[2].lower()
+    media_type = COVER_MEDIA_TYPES.get(ext, "image/jpeg")
     
-    return FileResponse(cover_path, media_type=media_type)
+    # The stat() behind the ETag doubles as the existence check
+    try:
+        return cover_file_response(request, cover_path, media_type)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Cover not found")
 
 
 @router.post("/collections/{id}/cover")
 async def upload_collection_cover(
     id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     db=Depends(get_db)
 ):
     """Upload a custom cover image for a collection."""
     
     # Verify collection exists
-    cursor = await db.execute("SELECT id, custom_cover_path FROM collections WHERE id = ?", [id])
-    collection = await cursor.fetchone()
+    collection = await qone(db, "SELECT id, custom_cover_path FROM collections WHERE id = ?", [id])
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     
     # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/webp", "image/gif"]
-    if file.content_type not in allowed_types:
+    if file.content_type not in ALLOWED_COVER_TYPES:
         raise HTTPException(status_code=400, detail="Invalid file type. Use JPEG, PNG, WebP, or GIF.")
     
-    # Create covers directory if needed
-    os.makedirs(COVERS_DIR, exist_ok=True)
+    # Trust the bytes, not the client-supplied content type
+    head = await file.read(12)
+    await file.seek(0)
+    if not _looks_like_image(head):
+        raise HTTPException(status_code=400, detail="Invalid file type. Use JPEG, PNG, WebP, or GIF.")
     
-    # Delete old cover if exists
-    old_path = collection["custom_cover_path"]
-    if old_path and os.path.exists(old_path):
-        try:
-            os.remove(old_path)
-        except:
-            pass
+    # Create covers directory if needed
+    await run_in_threadpool(os.makedirs, COVERS_DIR, exist_ok=True)
     
     # Generate unique filename
     ext = os.path.splitext(file.filename)[1] or ".jpg"
     filename = f"collection_{id}_{uuid.uuid4().hex[:8]}{ext}"
     filepath = os.path.join(COVERS_DIR, filename)
     
-    # Save file
+    # Save file off the event loop
     try:
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_in_threadpool(_save_cover_upload, file.file, filepath)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
     
@@ -1151,6 +1326,9 @@ async def upload_collection_cover(
     """, [filepath, id])
     await db.commit()
     
+    # Old cover is unreferenced now; remove it after the response is sent
+    background_tasks.add_task(_remove_cover_file, collection["custom_cover_path"])
+    
     return {"success": True, "custom_cover_path": filepath}
 
 
@@ -1166,16 +1344,15 @@ async def update_collection_cover_type(
     if cover_type not in ["mosaic", "gradient", "custom"]:
         raise HTTPException(status_code=400, detail="Invalid cover type")
     
-    # Verify collection exists
-    cursor = await db.execute("SELECT id FROM collections WHERE id = ?", [id])
-    if not await cursor.fetchone():
-        raise HTTPException(status_code=404, detail="Collection not found")
-    
-    await db.execute("""
+    # RETURNING doubles as the existence check
+    updated = await qone(db, """
         UPDATE collections 
         SET cover_type = ?, updated_at = CURRENT_TIMESTAMP
         WHERE id = ?
+        RETURNING id
     """, [cover_type, id])
+    if not updated:
+        raise HTTPException(status_code=404, detail="Collection not found")
     await db.commit()
     
     return {"success": True, "cover_type": cover_type}
@@ -1184,22 +1361,15 @@ async def update_collection_cover_type(
 @router.delete("/collections/{id}/cover")
 async def delete_collection_cover(
     id: int,
+    background_tasks: BackgroundTasks,
     db=Depends(get_db)
 ):
     """Delete custom cover and revert to mosaic."""
     
-    cursor = await db.execute("SELECT custom_cover_path FROM collections WHERE id = ?", [id])
-    collection = await cursor.fetchone()
+    collection = await qone(db, "SELECT custom_cover_path FROM collections WHERE id = ?", [id])
     if not collection:
         raise HTTPException(status_code=404, detail="Collection not found")
     
-    # Delete file if exists
-    if collection["custom_cover_path"] and os.path.exists(collection["custom_cover_path"]):
-        try:
-            os.remove(collection["custom_cover_path"])
-        except:
-            pass
-    
     # Reset to mosaic
     await db.execute("""
         UPDATE collections 
@@ -1208,4 +1378,7 @@ async def delete_collection_cover(
     """, [id])
     await db.commit()
     
+    # Delete file if exists, after the response is sent
+    background_tasks.add_task(_remove_cover_file, collection["custom_cover_path"])
+    
     return {"success": True}
@@ -6,16 +6,55 @@ Serves cover images for books, with proper caching headers.
 
 import os
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi.responses import FileResponse
 from services.covers import get_cover_path, EXTRACTED_COVERS_PATH, CUSTOM_COVERS_PATH
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/covers", tags=["covers"])
 
+COVER_CACHE_CONTROL = "public, max-age=86400"  # Cache for 24 hours
+
+# Cover file extension -> media type (unknown extensions are served as JPEG)
+COVER_MEDIA_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+
+# Content types accepted for cover uploads
+ALLOWED_COVER_TYPES = frozenset(COVER_MEDIA_TYPES.values())
+
+
+def cover_file_response(request: Request, cover_path: str, media_type: str) -> Response:
+    """
+    Serve a cover file with conditional-GET support.
+    
+    The ETag is derived from the file's inode, size and nanosecond mtime,
+    so a cover rewritten in place within the same second still gets a
+    new tag. A matching If-None-Match gets an empty
+    304 instead of the image bytes.
+    """
+    st = os.stat(cover_path)
+    etag = f'W/"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": COVER_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    
+    # stat_result spares FileResponse a second stat() of the same file
+    return FileResponse(cover_path, media_type=media_type, headers=headers, stat_result=st)
+
 
 @router.get("/{title_id}")
-async def get_cover_image(title_id: int):
+async def get_cover_image(title_id: int, request: Request):
     """
     Serve cover image for a title.
     
@@ -28,20 +67,7 @@ async def get_cover_image(title_id: int):
         raise HTTPException(status_code=404, detail="No cover found")
     
     # Determine media type from extension
-    ext = cover_path.split('.')[-1].lower()
-    media_types = {
-        'jpg': 'image/jpeg',
-        'jpeg': 'image/jpeg',
-        'png': 'image/png',
-        'gif': 'image/gif',
-        'webp': 'image/webp'
-    }
-    media_type = media_types.get(ext, 'image/jpeg')
+    ext = cover_path.rpartition('.')[2].lower()
+    media_type = COVER_MEDIA_TYPES.get(ext, 'image/jpeg')
     
-    return FileResponse(
-        cover_path,
-        media_type=media_type,
-        headers={
-            "Cache-Control": "public, max-age=86400",  # Cache for 24 hours
-        }
-    )
+    return cover_file_response(request, cover_path, media_type)
@@ -1,173 +1,156 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from datetime import datetime, date
+from functools import lru_cache
 from typing import Literal
-import random
 import json
+import time
 
+from cache import STATS_CACHE_TTL, stats_cache
 from database import get_db
+from json_response import JSONResponse
 from services.covers import get_cover_style, Theme
 
+# Book lists are returned as Response objects so FastAPI skips its
+# jsonable_encoder pass. With orjson the stored authors JSON is embedded
+# as-is via Fragment instead of being decoded and re-encoded per row.
+# Fragment does no checking of its own, so only text SQLite's json_valid
+# accepted is embedded; anything else becomes [].
+try:
+    from orjson import Fragment
+    
+    def _authors_field(raw, valid):
+        return Fragment(raw) if raw and valid else []
+except ImportError:
+    def _authors_field(raw, valid):
+        return json.loads(raw) if raw and valid else []
+
 router = APIRouter(prefix="/api/home", tags=["home"])
 
+# Cover styles are pure functions of (title, author, theme); this cache skips
+# get_cover_style's per-call key normalization and hashing for repeat books.
+# The returned CoverStyle objects are shared, so treat them as read-only.
+_cover_style = lru_cache(maxsize=4096)(get_cover_style)
+
+# List-endpoint queries, kept as constants so each request passes the
+# identical statement text
+SQL_IN_PROGRESS = """
+    SELECT 
+        t.id, t.title, t.authors, t.series, t.series_number,
+        t.category, t.word_count, t.status, t.rating,
+        t.acquisition_status, t.has_cover, t.cover_path, t.cover_source,
+        json_valid(t.authors) AS authors_valid,
+        CASE WHEN json_valid(t.authors) THEN json_extract(t.authors, '$[0]') END AS primary_author
+    FROM titles t
+    WHERE t.status = 'In Progress' 
+      AND t.acquisition_status = 'owned'
+      AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
+    ORDER BY t.updated_at DESC
+    LIMIT 5
+"""
+
+SQL_RECENTLY_ADDED = """
+    SELECT 
+        t.id, t.title, t.authors, t.series, t.series_number,
+        t.category, t.word_count, t.status, t.rating,
+        t.acquisition_status, t.created_at, t.has_cover, t.cover_path, t.cover_source,
+        json_valid(t.authors) AS authors_valid,
+        CASE WHEN json_valid(t.authors) THEN json_extract(t.authors, '$[0]') END AS primary_author
+    FROM titles t
+    WHERE t.acquisition_status = 'owned'
+      AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
+    ORDER BY t.created_at DESC
+    LIMIT 20
+"""
+
+SQL_DISCOVER = """
+    SELECT 
+        t.id, t.title, t.authors, t.series, t.series_number,
+        t.category, t.word_count, t.status, t.rating,
+        t.acquisition_status, t.has_cover, t.cover_path, t.cover_source,
+        json_valid(t.authors) AS authors_valid,
+        CASE WHEN json_valid(t.authors) THEN json_extract(t.authors, '$[0]') END AS primary_author
+    FROM titles t
+    WHERE t.status = 'Unread' 
+      AND t.acquisition_status = 'owned'
+      AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
+    ORDER BY RANDOM()
+    LIMIT 6
+"""
+
+SQL_QUICK_READS = """
+    SELECT 
+        t.id, t.title, t.authors, t.series, t.series_number,
+        t.category, t.word_count, t.status, t.rating,
+        t.acquisition_status, t.has_cover, t.cover_path, t.cover_source,
+        json_valid(t.authors) AS authors_valid,
+        CASE WHEN json_valid(t.authors) THEN json_extract(t.authors, '$[0]') END AS primary_author
+    FROM titles t
+    WHERE t.status = 'Unread' 
+      AND t.acquisition_status = 'owned'
+      AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
+      AND t.word_count IS NOT NULL
+      AND t.word_count > 0
+      AND t.word_count <= ?
+      AND t.word_count >= 1000
+    ORDER BY t.word_count ASC
+    LIMIT 10
+"""
+
+
+def _row_to_book(row) -> dict:
+    """Build a home list book from a list-query row plus its cover style."""
+    # Selected columns keep their names; SQLite already pulled out the
+    # first author, so the authors array itself is never parsed here
+    book = {**row}
+    authors_valid = book.pop("authors_valid")
+    # Fall back only when there is no first author; an empty-string
+    # author stays "", as in the titles and collections routers
+    primary_author = book.pop("primary_author")
+    if primary_author is None:
+        primary_author = "Unknown Author"
+    
+    # Generate cover style
+    cover_style = _cover_style(row["title"] or "Untitled", primary_author, Theme.DARK)
+    
+    book["authors"] = _authors_field(row["authors"], authors_valid)
+    book["cover_gradient"] = cover_style.css_gradient
+    book["cover_bg_color"] = cover_style.background_color
+    book["cover_text_color"] = cover_style.text_color
+    return book
+
 
 @router.get("/in-progress")
 async def get_in_progress(db=Depends(get_db)):
     """Get up to 5 in-progress owned books."""
-    cursor = await db.execute("""
-        SELECT 
-            t.id, t.title, t.authors, t.series, t.series_number,
-            t.category, t.word_count, t.status, t.rating,
-            t.acquisition_status, t.has_cover, t.cover_path, t.cover_source
-        FROM titles t
-        WHERE t.status = 'In Progress' 
-          AND t.acquisition_status = 'owned'
-          AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
-        ORDER BY t.updated_at DESC
-        LIMIT 5
-    """)
+    cursor = await db.execute(SQL_IN_PROGRESS)
     rows = await cursor.fetchall()
     
-    books = []
-    for row in rows:
-        # Parse authors JSON
-        authors = json.loads(row[2]) if row[2] else []
-        primary_author = authors[0] if authors else "Unknown Author"
-        
-        # Generate cover style
-        cover_style = get_cover_style(row[1] or "Untitled", primary_author, Theme.DARK)
-        
-        books.append({
-            "id": row[0],
-            "title": row[1],
-            "authors": authors,
-            "series": row[3],
-            "series_number": row[4],
-            "category": row[5],
-            "word_count": row[6],
-            "status": row[7],
-            "rating": row[8],
-            "cover_gradient": cover_style.css_gradient,
-            "cover_bg_color": cover_style.background_color,
-            "cover_text_color": cover_style.text_color,
-            "acquisition_status": row[9],
-            "has_cover": row[10],
-            "cover_path": row[11],
-            "cover_source": row[12]
-        })
+    books = [_row_to_book(row) for row in rows]
     
-    return {"books": books, "count": len(books)}
+    return JSONResponse({"books": books, "count": len(books)})
 
 
 @router.get("/recently-added")
 async def get_recently_added(db=Depends(get_db)):
     """Get the 20 most recently added owned books."""
-    cursor = await db.execute("""
-        SELECT 
-            t.id, t.title, t.authors, t.series, t.series_number,
-            t.category, t.word_count, t.status, t.rating,
-            t.acquisition_status, t.created_at, t.has_cover, t.cover_path, t.cover_source
-        FROM titles t
-        WHERE t.acquisition_status = 'owned'
-          AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
-        ORDER BY t.created_at DESC
-        LIMIT 20
-    """)
+    cursor = await db.execute(SQL_RECENTLY_ADDED)
     rows = await cursor.fetchall()
     
-    books = []
-    for row in rows:
-        # Parse authors JSON
-        authors = json.loads(row[2]) if row[2] else []
-        primary_author = authors[0] if authors else "Unknown Author"
-        
-        # Generate cover style
-        cover_style = get_cover_style(row[1] or "Untitled", primary_author, Theme.DARK)
-        
-        books.append({
-            "id": row[0],
-            "title": row[1],
-            "authors": authors,
-            "series": row[3],
-            "series_number": row[4],
-            "category": row[5],
-            "word_count": row[6],
-            "status": row[7],
-            "rating": row[8],
-            "cover_gradient": cover_style.css_gradient,
-            "cover_bg_color": cover_style.background_color,
-            "cover_text_color": cover_style.text_color,
-            "acquisition_status": row[9],
-            "created_at": row[10],
-            "has_cover": row[11],
-            "cover_path": row[12],
-            "cover_source": row[13]
-        })
+    books = [_row_to_book(row) for row in rows]
     
-    return {"books": books, "count": len(books)}
+    return JSONResponse({"books": books, "count": len(books)})
 
 
 @router.get("/discover")
 async def get_discover(db=Depends(get_db)):
     """Get 6 random unread owned books for discovery."""
-    # First, get all unread owned book IDs
-    cursor = await db.execute("""
-        SELECT id FROM titles
-        WHERE status = 'Unread' 
-          AND acquisition_status = 'owned'
-          AND (is_orphaned IS NULL OR is_orphaned = 0)
-    """)
-    all_ids = [row[0] for row in await cursor.fetchall()]
-    
-    if not all_ids:
-        return {"books": [], "count": 0}
-    
-    # Randomly select up to 6
-    selected_ids = random.sample(all_ids, min(6, len(all_ids)))
-    
-    # Fetch full details for selected books
-    placeholders = ",".join("?" * len(selected_ids))
-    cursor = await db.execute(f"""
-        SELECT 
-            t.id, t.title, t.authors, t.series, t.series_number,
-            t.category, t.word_count, t.status, t.rating,
-            t.acquisition_status, t.has_cover, t.cover_path, t.cover_source
-        FROM titles t
-        WHERE t.id IN ({placeholders})
-    """, selected_ids)
+    # Sample in SQLite - rows come back already in random order
+    cursor = await db.execute(SQL_DISCOVER)
     rows = await cursor.fetchall()
     
-    books = []
-    for row in rows:
-        # Parse authors JSON
-        authors = json.loads(row[2]) if row[2] else []
-        primary_author = authors[0] if authors else "Unknown Author"
-        
-        # Generate cover style
-        cover_style = get_cover_style(row[1] or "Untitled", primary_author, Theme.DARK)
-        
-        books.append({
-            "id": row[0],
-            "title": row[1],
-            "authors": authors,
-            "series": row[3],
-            "series_number": row[4],
-            "category": row[5],
-            "word_count": row[6],
-            "status": row[7],
-            "rating": row[8],
-            "cover_gradient": cover_style.css_gradient,
-            "cover_bg_color": cover_style.background_color,
-            "cover_text_color": cover_style.text_color,
-            "acquisition_status": row[9],
-            "has_cover": row[10],
-            "cover_path": row[11],
-            "cover_source": row[12]
-        })
-    
-    # Shuffle to randomize display order
-    random.shuffle(books)
+    books = [_row_to_book(row) for row in rows]
     
-    return {"books": books, "count": len(books)}
+    return JSONResponse({"books": books, "count": len(books)})
 
 
 @router.get("/quick-reads")
@@ -182,53 +165,12 @@ async def get_quick_reads(db=Depends(get_db)):
     max_words = wpm * 60 * 3
     
     # Get unread owned books under the word limit, sorted by word count (quickest first)
-    cursor = await db.execute("""
-        SELECT 
-            t.id, t.title, t.authors, t.series, t.series_number,
-            t.category, t.word_count, t.status, t.rating,
-            t.acquisition_status, t.has_cover, t.cover_path, t.cover_source
-        FROM titles t
-        WHERE t.status = 'Unread' 
-          AND t.acquisition_status = 'owned'
-          AND (t.is_orphaned IS NULL OR t.is_orphaned = 0)
-          AND t.word_count IS NOT NULL
-          AND t.word_count > 0
-          AND t.word_count <= ?
-          AND t.word_count >= 1000
-        ORDER BY t.word_count ASC
-        LIMIT 10
-    """, (max_words,))
+    cursor = await db.execute(SQL_QUICK_READS, (max_words,))
     rows = await cursor.fetchall()
     
-    books = []
-    for row in rows:
-        # Parse authors JSON
-        authors = json.loads(row[2]) if row[2] else []
-        primary_author = authors[0] if authors else "Unknown Author"
-        
-        # Generate cover style
-        cover_style = get_cover_style(row[1] or "Untitled", primary_author, Theme.DARK)
-        
-        books.append({
-            "id": row[0],
-            "title": row[1],
-            "authors": authors,
-            "series": row[3],
-            "series_number": row[4],
-            "category": row[5],
-            "word_count": row[6],
-            "status": row[7],
-            "rating": row[8],
-            "cover_gradient": cover_style.css_gradient,
-            "cover_bg_color": cover_style.background_color,
-            "cover_text_color": cover_style.text_color,
-            "acquisition_status": row[9],
-            "has_cover": row[10],
-            "cover_path": row[11],
-            "cover_source": row[12]
-        })
+    books = [_row_to_book(row) for row in rows]
     
-    return {"books": books, "count": len(books), "max_hours": 3, "wpm": wpm}
+    return JSONResponse({"books": books, "count": len(books), "max_hours": 3, "wpm": wpm})
 
 
 @router.get("/stats")
@@ -239,6 +181,10 @@ async def get_stats(
     """Get reading stats for the current month or year."""
     today = date.today()
     
+    cached = stats_cache.get(period)
+    if cached and cached[0] == today and cached[1] > time.monotonic():
+        return Response(content=cached[2], media_type="application/json")
+    
     if period == "month":
         # First day of current month
         period_start = date(today.year, today.month, 1)
@@ -250,26 +196,13 @@ async def get_stats(
     
     period_start_str = period_start.isoformat()
     
-    # Get words read and titles finished from sessions completed in period
-    cursor = await db.execute("""
-        SELECT 
-            COALESCE(SUM(t.word_count), 0) as words_read,
-            COUNT(rs.id) as titles_finished
-        FROM reading_sessions rs
-        JOIN titles t ON rs.title_id = t.id
-        WHERE rs.date_finished >= ?
-          AND rs.session_status = 'finished'
-          AND t.acquisition_status = 'owned'
-    """, (period_start_str,))
-    row = await cursor.fetchone()
-    words_read = row[0] or 0
-    titles_finished = row[1] or 0
-    
-    # Get category breakdown for finished books in period
+    # One pass over finished sessions in period, broken down by category;
+    # the overall totals are the sums of the per-category rows
     cursor = await db.execute("""
         SELECT 
             t.category,
-            COUNT(rs.id) as count
+            COUNT(rs.id) as count,
+            COALESCE(SUM(t.word_count), 0) as words
         FROM reading_sessions rs
         JOIN titles t ON rs.title_id = t.id
         WHERE rs.date_finished >= ?
@@ -279,9 +212,11 @@ async def get_stats(
         ORDER BY count DESC
     """, (period_start_str,))
     category_rows = await cursor.fetchall()
+    words_read = sum(row[2] for row in category_rows)
+    titles_finished = sum(row[1] for row in category_rows)
     
     categories = []
-    total_category_count = sum(row[1] for row in category_rows)
+    total_category_count = titles_finished
     for row in category_rows:
         cat_name = row[0] or "Uncategorized"
         cat_count = row[1]
@@ -292,10 +227,12 @@ async def get_stats(
             "percentage": percentage
         })
     
-    return {
+    response = JSONResponse({
         "period": period,
         "period_label": period_label,
         "words_read": words_read,
         "titles_finished": titles_finished,
         "categories": categories
-    }
+    })
+    stats_cache[period] = (today, time.monotonic() + STATS_CACHE_TTL, response.body)
+    return response
@@ -11,8 +11,10 @@ from typing import Optional, List
 from datetime import datetime
 import aiosqlite
 
-from database import get_db, sync_title_from_sessions
+from cache import invalidate_stats_cache
+from database import get_db, qall, qone, renumber_sessions, sync_title_from_sessions, transaction
 from constants import COARSE_FORMATS
+from json_response import JSONResponse
 
 router = APIRouter(prefix="/api", tags=["sessions"])
 
@@ -53,6 +55,73 @@ class SessionsListResponse(BaseModel):
     average_rating: Optional[float]
 
 
+# =============================================================================
+# Validation
+# =============================================================================
+
+# Valid session_status values, in the order error messages list them
+SESSION_STATUSES = ['in_progress', 'finished', 'dnf']
+_VALID_SESSION_STATUSES = frozenset(SESSION_STATUSES)
+
+
+def _validate_status(status: str) -> None:
+    """Reject a session_status outside SESSION_STATUSES."""
+    if status not in _VALID_SESSION_STATUSES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid session_status. Must be one of: {SESSION_STATUSES}"
+        )
+
+
+def _validate_rating(rating: Optional[int], status: str) -> None:
+    """
+    Check a rating (if provided) is 1-5 and that the session it lands on,
+    with its resulting status, is finished or dnf.
+    """
+    if rating is None:
+        return
+    if rating < 1 or rating > 5:
+        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
+    # Rating only allowed for finished or dnf
+    if status == 'in_progress':
+        raise HTTPException(
+            status_code=400,
+            detail="Cannot rate a session that is still in progress"
+        )
+
+
+# =============================================================================
+# Update statements
+# =============================================================================
+
+# PATCHable columns; bit i of a mask means _SESSION_UPDATE_COLUMNS[i] is set
+_SESSION_UPDATE_COLUMNS = ('date_started', 'date_finished', 'session_status', 'rating', 'format')
+
+
+def _build_update_sql(mask: int) -> str:
+    """UPDATE ... RETURNING for the columns in mask, plus updated_at."""
+    assignments = [
+        f"{column} = ?"
+        for bit, column in enumerate(_SESSION_UPDATE_COLUMNS)
+        if mask & (1 << bit)
+    ]
+    assignments.append("updated_at = ?")
+    return f"""
+        UPDATE reading_sessions
+        SET {', '.join(assignments)}
+        WHERE id = ?
+        RETURNING id, title_id, session_number, date_started, date_finished,
+                  session_status, rating, format, created_at, updated_at
+    """
+
+
+# One fixed SQL string per field combination, built once at import
+_UPDATE_SQL_BY_MASK = {
+    mask: _build_update_sql(mask)
+    for mask in range(1 << len(_SESSION_UPDATE_COLUMNS))
+}
+
+
 # =============================================================================
 # Endpoints
 # =============================================================================
@@ -64,52 +133,61 @@ async def list_sessions(title_id: int, db: aiosqlite.Connection = Depends(get_db
     Also returns aggregate stats (times_read counts finished sessions
     only; average_rating spans all rated sessions).
     """
-    # Verify title exists
-    cursor = await db.execute("SELECT id FROM titles WHERE id = ?", (title_id,))
-    if not await cursor.fetchone():
-        raise HTTPException(status_code=404, detail="Title not found")
-
     # Projection order — MUST match sync_title_from_sessions (database.py):
     # latest date_started first, ties broken by higher id, NULL date_started
     # last under DESC. The first row is the title status pill's source.
-    cursor = await db.execute("""
+    # The stats ride along as window aggregates over the title's sessions:
+    # a "read" is a closed Done session only; in_progress and dnf never
+    # count (B3 ruling 2026-07-15, matching the projection's own
+    # finished-only closed-date logic). AVG skips unrated sessions.
+    # The window frame spans the whole title; ordering it like the result
+    # lets idx_reading_sessions_title_started supply both without a sort.
+    rows = await qall(db, """
         SELECT id, title_id, session_number, date_started, date_finished,
-               session_status, rating, format, created_at, updated_at
+               session_status, rating, format, created_at, updated_at,
+               SUM(session_status = 'finished') OVER w AS times_read,
+               AVG(rating) OVER w AS average_rating
         FROM reading_sessions
         WHERE title_id = ?
+        WINDOW w AS (
+            ORDER BY date_started DESC, id DESC
+            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+        )
         ORDER BY date_started DESC, id DESC
     """, (title_id,))
-    rows = await cursor.fetchall()
-    
-    sessions = []
-    ratings = []
-    for row in rows:
-        sessions.append(SessionResponse(
-            id=row[0],
-            title_id=row[1],
-            session_number=row[2],
-            date_started=row[3],
-            date_finished=row[4],
-            session_status=row[5],
-            rating=row[6],
-            format=row[7],
-            created_at=row[8],
-            updated_at=row[9]
-        ))
-        if row[6] is not None:
-            ratings.append(row[6])
     
-    # Calculate stats — a "read" is a closed Done session only; in_progress
-    # and dnf never count (B3 ruling 2026-07-15, matching the projection's
-    # own finished-only closed-date logic)
-    times_read = sum(1 for s in sessions if s.session_status == 'finished')
-    average_rating = round(sum(ratings) / len(ratings), 1) if ratings else None
-    
-    return SessionsListResponse(
-        sessions=sessions,
-        times_read=times_read,
-        average_rating=average_rating
-    )
+    # No sessions: only then does the title itself need checking
+    if not rows:
+        if not await qone(db, "SELECT 1 FROM titles WHERE id = ?", (title_id,)):
+            raise HTTPException(status_code=404, detail="Title not found")
+    
+    # Plain dicts in a returned JSONResponse: the rows are already the
+    # response shape, so SessionsListResponse only documents it
+    sessions = [
+        {
+            "id": row[0],
+            "title_id": row[1],
+            "session_number": row[2],
+            "date_started": row[3],
+            "date_finished": row[4],
+            "session_status": row[5],
+            "rating": row[6],
+            "format": row[7],
+            "created_at": row[8],
+            "updated_at": row[9]
+        }
+        for row in rows
+    ]
+    
+    # Round in Python, not SQL: ROUND() rounds halves away from zero
+    times_read = rows[0][10] if rows else 0
+    average_rating = round(rows[0][11], 1) if rows and rows[0][11] is not None else None
+    
+    return JSONResponse({
+        "sessions": sessions,
+        "times_read": times_read,
+        "average_rating": average_rating
+    })
 
 
 @router.post("/titles/{title_id}/sessions", response_model=SessionResponse)
@@ -122,29 +200,8 @@ async def create_session(
     Add a new reading session for a title.
     Session number is auto-assigned (max + 1).
     """
-    # Verify title exists
-    cursor = await db.execute("SELECT id FROM titles WHERE id = ?", (title_id,))
-    if not await cursor.fetchone():
-        raise HTTPException(status_code=404, detail="Title not found")
-    
-    # Validate session_status
-    valid_statuses = ['in_progress', 'finished', 'dnf']
-    if session.session_status not in valid_statuses:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Invalid session_status. Must be one of: {valid_statuses}"
-        )
-    
-    # Validate rating if provided
-    if session.rating is not None and (session.rating < 1 or session.rating > 5):
-        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
-    
-    # Rating only allowed for finished or dnf
-    if session.rating is not None and session.session_status == 'in_progress':
-        raise HTTPException(
-            status_code=400, 
-            detail="Cannot rate a session that is still in progress"
-        )
+    _validate_status(session.session_status)
+    _validate_rating(session.rating, session.session_status)
     
     # Validate format if provided (sessions keep the coarse list — S15
     # storage formats apply to editions only)
@@ -155,37 +212,34 @@ async def create_session(
                 detail=f"Invalid format. Must be one of: {COARSE_FORMATS}"
             )
     
-    # Get next session number
-    cursor = await db.execute(
-        "SELECT COALESCE(MAX(session_number), 0) + 1 FROM reading_sessions WHERE title_id = ?",
-        (title_id,)
-    )
-    next_number = (await cursor.fetchone())[0]
-    
-    # Insert session
+    # Insert session with the next session number (max + 1) computed
+    # inline; RETURNING hands back the stored row, so no re-SELECT.
+    # The title_id foreign key (enforced by get_db) rejects a missing
+    # title, so there's no separate existence check.
+    # The insert and the title projection commit together
     now = datetime.utcnow().isoformat()
-    cursor = await db.execute("""
-        INSERT INTO reading_sessions (
-            title_id, session_number, date_started, date_finished, 
-            session_status, rating, format, created_at, updated_at
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        title_id, next_number, session.date_started, session.date_finished,
-        session.session_status, session.rating, session.format, now, now
-    ))
-    session_id = cursor.lastrowid
-
-    # Recompute the title projection in the same transaction
-    await sync_title_from_sessions(db, title_id)
-    await db.commit()
-    
-    # Return created session
-    cursor = await db.execute("""
-        SELECT id, title_id, session_number, date_started, date_finished,
-               session_status, rating, format, created_at, updated_at
-        FROM reading_sessions WHERE id = ?
-    """, (session_id,))
-    row = await cursor.fetchone()
+    try:
+        async with transaction(db):
+            row = await qone(db, """
+                INSERT INTO reading_sessions (
+                    title_id, session_number, date_started, date_finished, 
+                    session_status, rating, format, created_at, updated_at
+                )
+                SELECT ?, COALESCE(MAX(session_number), 0) + 1, ?, ?, ?, ?, ?, ?, ?
+                FROM reading_sessions WHERE title_id = ?
+                RETURNING id, title_id, session_number, date_started, date_finished,
+                          session_status, rating, format, created_at, updated_at
+            """, (
+                title_id, session.date_started, session.date_finished,
+                session.session_status, session.rating, session.format, now, now,
+                title_id
+            ))
+            await sync_title_from_sessions(db, title_id)
+    except aiosqlite.IntegrityError as e:
+        if "FOREIGN KEY" in str(e):
+            raise HTTPException(status_code=404, detail="Title not found")
+        raise
+    invalidate_stats_cache()
     
     return SessionResponse(
         id=row[0],
@@ -211,11 +265,11 @@ async def update_session(
     Update a reading session (dates, status, rating).
     """
     # Get existing session
-    cursor = await db.execute(
+    row = await qone(
+        db,
         "SELECT id, title_id, session_status FROM reading_sessions WHERE id = ?",
         (session_id,)
     )
-    row = await cursor.fetchone()
     if not row:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -225,25 +279,11 @@ async def update_session(
     # Determine new status (use update value or keep current)
     new_status = updates.session_status if updates.session_status is not None else current_status
     
-    # Validate session_status if provided
+    # Validate session_status if provided; the rating is checked against
+    # the status the session will have after this update
     if updates.session_status is not None:
-        valid_statuses = ['in_progress', 'finished', 'dnf']
-        if updates.session_status not in valid_statuses:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid session_status. Must be one of: {valid_statuses}"
-            )
-    
-    # Validate rating if provided
-    if updates.rating is not None and (updates.rating < 1 or updates.rating > 5):
-        raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
-    
-    # Rating only allowed for finished or dnf
-    if updates.rating is not None and new_status == 'in_progress':
-        raise HTTPException(
-            status_code=400,
-            detail="Cannot rate a session that is still in progress"
-        )
+        _validate_status(updates.session_status)
+    _validate_rating(updates.rating, new_status)
     
    # Validate format if provided (empty string is allowed to clear;
    # sessions keep the coarse list — S15 storage formats apply to editions only)
@@ -254,56 +294,32 @@ async def update_session(
                 detail=f"Invalid format. Must be one of: {COARSE_FORMATS}"
             )
     
-    # Build update query dynamically
-    update_fields = []
+    # Pick the prebuilt statement for the set of fields being changed.
+    # Empty string means "clear" (dates, format), None means "don't change".
+    values = (
+        updates.date_started, updates.date_finished,
+        updates.session_status, updates.rating, updates.format
+    )
+    mask = 0
     params = []
-    
-    # Handle dates: empty string means "clear", None means "don't change"
-    if updates.date_started is not None:
-        update_fields.append("date_started = ?")
-        params.append(updates.date_started if updates.date_started != '' else None)
-    
-    if updates.date_finished is not None:
-        update_fields.append("date_finished = ?")
-        params.append(updates.date_finished if updates.date_finished != '' else None)
-    
-    if updates.session_status is not None:
-        update_fields.append("session_status = ?")
-        params.append(updates.session_status)
-    
-    if updates.rating is not None:
-        update_fields.append("rating = ?")
-        params.append(updates.rating)
-    
-    if updates.format is not None:
-        update_fields.append("format = ?")
-        # Empty string means clear, None means don't change
-        params.append(updates.format if updates.format != '' else None)
+    for bit, value in enumerate(values):
+        if value is not None:
+            mask |= 1 << bit
+            params.append(value if value != '' else None)
     
     # Always update updated_at
-    update_fields.append("updated_at = ?")
     params.append(datetime.utcnow().isoformat())
-    
     params.append(session_id)
     
-    if update_fields:
-        await db.execute(f"""
-            UPDATE reading_sessions
-            SET {', '.join(update_fields)}
-            WHERE id = ?
-        """, params)
-
-    # Recompute the title projection in the same transaction
-    await sync_title_from_sessions(db, title_id)
-    await db.commit()
-    
-    # Return updated session
-    cursor = await db.execute("""
-        SELECT id, title_id, session_number, date_started, date_finished,
-               session_status, rating, format, created_at, updated_at
-        FROM reading_sessions WHERE id = ?
-    """, (session_id,))
-    row = await cursor.fetchone()
+    # RETURNING hands back the updated row, so no re-SELECT; the update
+    # and the title projection commit together
+    async with transaction(db):
+        row = await qone(db, _UPDATE_SQL_BY_MASK[mask], params)
+        if not row:
+            # Deleted since the lookup above
+            raise HTTPException(status_code=404, detail="Session not found")
+        await sync_title_from_sessions(db, title_id)
+    invalidate_stats_cache()
     
     return SessionResponse(
         id=row[0],
@@ -325,32 +341,25 @@ async def delete_session(session_id: int, db: aiosqlite.Connection = Depends(get
     Delete a reading session.
     If this was the only session, title becomes 'Unread'.
     """
-    # Get session to find title_id
-    cursor = await db.execute(
-        "SELECT title_id, session_number FROM reading_sessions WHERE id = ?",
-        (session_id,)
-    )
-    row = await cursor.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    title_id = row[0]
-    deleted_number = row[1]
-    
-    # Delete the session
-    await db.execute("DELETE FROM reading_sessions WHERE id = ?", (session_id,))
-    
-    # Renumber remaining sessions to keep sequence continuous
-    await db.execute("""
-        UPDATE reading_sessions
-        SET session_number = session_number - 1,
-            updated_at = ?
-        WHERE title_id = ? AND session_number > ?
-    """, (datetime.utcnow().isoformat(), title_id, deleted_number))
-
-    # Recompute the title projection in the same transaction
-    await sync_title_from_sessions(db, title_id)
-    await db.commit()
+    # Delete, renumber and re-project as one transaction
+    async with transaction(db):
+        # Delete the session; RETURNING gives the title_id
+        row = await qone(
+            db,
+            "DELETE FROM reading_sessions WHERE id = ? RETURNING title_id",
+            (session_id,)
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        title_id = row[0]
+        
+        # Renumber remaining sessions to keep sequence continuous
+        await renumber_sessions(db, title_id, datetime.utcnow().isoformat())
+
+        # Recompute the title projection
+        await sync_title_from_sessions(db, title_id)
+    invalidate_stats_cache()
     
     return {"message": "Session deleted", "title_id": title_id}
 
@@ -9,7 +9,7 @@ Endpoints:
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from database import get_db
+from database import get_db, qall, qone
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
@@ -26,18 +26,14 @@ class SettingResponse(BaseModel):
 @router.get("")
 async def get_all_settings(db=Depends(get_db)):
     """Get all settings as key-value pairs"""
-    cursor = await db.execute("SELECT key, value FROM settings")
-    rows = await cursor.fetchall()
+    rows = await qall(db, "SELECT key, value FROM settings")
     return {row[0]: row[1] for row in rows}
 
 
 @router.get("/{key}")
 async def get_setting(key: str, db=Depends(get_db)):
     """Get a single setting by key"""
-    cursor = await db.execute(
-        "SELECT key, value FROM settings WHERE key = ?", (key,)
-    )
-    row = await cursor.fetchone()
+    row = await qone(db, "SELECT key, value FROM settings WHERE key = ?", (key,))
     if not row:
         raise HTTPException(status_code=404, detail=f"Setting '{key}' not found")
     return {"key": row[0], "value": row[1]}
@@ -23,7 +23,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Body, UploadFile,
 from pydantic import BaseModel
 import aiosqlite
 
-from database import get_db, sync_title_from_sessions
+# Faster decoding of the JSON list columns (authors, tags, ...); json is the fallback
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+from cache import invalidate_stats_cache
+from database import get_db, qone, renumber_sessions, sync_title_from_sessions, transaction
+from json_response import JSONResponse
 from constants import ALL_EDITION_FORMATS, EBOOK_FORMATS, EXTENSION_TO_FORMAT
 from services.trash import move_to_trash, move_file_to_trash, TrashError, TRASH_DIR_NAME
 from services.upload_service import validate_file
@@ -274,51 +283,61 @@ def parse_json_field(value: str, default: list = None) -> list:
     if not value:
         return default or []
     try:
-        return json.loads(value)
-    except (json.JSONDecodeError, TypeError):
+        return _json_loads(value)
+    except (ValueError, TypeError):
         return default or []
 
 
-def row_to_title_summary(row) -> TitleSummary:
-    """Convert a database row to TitleSummary."""
+def _escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input matches literally (use with ESCAPE '\\')."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def row_to_title_summary(row) -> dict:
+    """Convert a database row to a TitleSummary-shaped dict.
+
+    The list endpoints return these inside a JSONResponse, bypassing
+    response_model validation, so keys and types must match TitleSummary.
+    """
     authors = parse_json_field(row["authors"])
     primary_author = authors[0] if authors else "Unknown Author"
+    columns = set(row.keys())
     
     # Generate cover style from title/author
     cover_style = get_cover_style(row["title"] or "Untitled", primary_author, Theme.DARK)
     
     # Determine acquisition status (fallback to is_tbr for backward compatibility)
-    if "acquisition_status" in row.keys() and row["acquisition_status"]:
+    if "acquisition_status" in columns and row["acquisition_status"]:
         acquisition_status = row["acquisition_status"]
-    elif "is_tbr" in row.keys():
+    elif "is_tbr" in columns:
         acquisition_status = 'wishlist' if row["is_tbr"] else 'owned'
     else:
         acquisition_status = 'owned'
     
-    return TitleSummary(
-        id=row["id"],
-        title=row["title"],
-        authors=authors,
-        series=row["series"],
-        series_number=row["series_number"],
-        category=row["category"],
-        status=row["status"],
-        rating=row["rating"],
-        word_count=row["word_count"] if "word_count" in row.keys() else None,
-        cover_gradient=cover_style.css_gradient,
-        cover_bg_color=cover_style.background_color,
-        cover_text_color=cover_style.text_color,
+    return {
+        "id": row["id"],
+        "title": row["title"],
+        "authors": authors,
+        "series": row["series"],
+        "series_number": row["series_number"],
+        "category": row["category"],
+        "status": row["status"],
+        "rating": float(row["rating"]) if row["rating"] is not None else None,
+        "word_count": row["word_count"] if "word_count" in columns else None,
+        "cover_gradient": cover_style.css_gradient,
+        "cover_bg_color": cover_style.background_color,
+        "cover_text_color": cover_style.text_color,
         # Gradient color support (from database)
-        cover_color_1=row["cover_color_1"] if "cover_color_1" in row.keys() else None,
-        cover_color_2=row["cover_color_2"] if "cover_color_2" in row.keys() else None,
+        "cover_color_1": row["cover_color_1"] if "cover_color_1" in columns else None,
+        "cover_color_2": row["cover_color_2"] if "cover_color_2" in columns else None,
         # Cover image fields (Phase 9C)
-        has_cover=bool(row["has_cover"]) if "has_cover" in row.keys() else False,
-        cover_path=row["cover_path"] if "cover_path" in row.keys() else None,
-        cover_source=row["cover_source"] if "cover_source" in row.keys() else None,
-        has_notes=row["note_count"] > 0 if "note_count" in row.keys() else False,
-        created_at=row["created_at"] if "created_at" in row.keys() else None,
-        acquisition_status=acquisition_status
-    )
+        "has_cover": bool(row["has_cover"]) if "has_cover" in columns else False,
+        "cover_path": row["cover_path"] if "cover_path" in columns else None,
+        "cover_source": row["cover_source"] if "cover_source" in columns else None,
+        "has_notes": row["note_count"] > 0 if "note_count" in columns else False,
+        "created_at": row["created_at"] if "created_at" in columns else None,
+        "acquisition_status": acquisition_status
+    }
 
 
 async def row_to_title_detail(row, db) -> TitleDetail:
@@ -414,6 +433,10 @@ async def row_to_title_detail(row, db) -> TitleDetail:
     )
 
 
+# [[Title]] links in note content (non-greedy to handle brackets in titles)
+_NOTE_LINK_RE = re.compile(r'\[\[(.+?)\]\]')
+
+
 async def parse_and_store_links(db, note_id: int, content: str) -> None:
     """
     Parse [[Title]] patterns from note content and store links.
@@ -423,9 +446,8 @@ async def parse_and_store_links(db, note_id: int, content: str) -> None:
     - Clears existing links for this note
     - Inserts new links
     """
-    # Extract all [[...]] patterns (non-greedy to handle brackets in titles)
-    link_pattern = r'\[\[(.+?)\]\]'
-    matches = re.findall(link_pattern, content or '')
+    # Extract all [[...]] patterns
+    matches = _NOTE_LINK_RE.findall(content or '')
     
     # Remove duplicates while preserving order
     unique_titles = list(dict.fromkeys(matches))
@@ -512,16 +534,16 @@ async def list_titles(
         params.append(series)
     
     if search:
-        where_clauses.append("(title LIKE ? OR authors LIKE ?)")
-        search_term = f"%{search}%"
+        where_clauses.append("(title LIKE ? ESCAPE '\\' OR authors LIKE ? ESCAPE '\\')")
+        search_term = f"%{_escape_like(search)}%"
         params.extend([search_term, search_term])
     
     # Filter by tags (comma-separated, must have ALL specified tags)
     if tags:
-        tag_list = [t.strip().lower() for t in tags.split(',') if t.strip()]
+        tag_list = [_escape_like(t.strip().lower()) for t in tags.split(',') if t.strip()]
         for tag in tag_list:
             where_clauses.append(
-                '(LOWER(tags) LIKE ? OR LOWER(tags) LIKE ?)'
+                "(LOWER(tags) LIKE ? ESCAPE '\\' OR LOWER(tags) LIKE ? ESCAPE '\\')"
             )
             params.extend([
                 f'%"{tag}",%',     # Tag followed by comma (not last item)
@@ -551,8 +573,8 @@ async def list_titles(
     
     if ship:
         # Search within JSON array - ship name is in relationships field
-        where_clauses.append("relationships LIKE ?")
-        params.append(f'%"{ship}"%')
+        where_clauses.append("relationships LIKE ? ESCAPE '\\'")
+        params.append(f'%"{_escape_like(ship)}"%')
     
     # Format filter (requires join with editions)
     if format:
@@ -644,7 +666,7 @@ async def list_titles(
     
     titles = [row_to_title_summary(row) for row in rows]
     
-    return TitlesListResponse(books=titles, total=total)
+    return JSONResponse({"books": titles, "total": total})
 
 
 # Backward compatibility: /books redirects to /titles
@@ -720,8 +742,8 @@ async def match_book(
     # Strategy 2: Title contains search (for partial matches)
     if not matches:
         cursor = await db.execute(
-            "SELECT id, title, authors FROM titles WHERE LOWER(title) LIKE ?",
-            [f"%{title_lower}%"]
+            "SELECT id, title, authors FROM titles WHERE LOWER(title) LIKE ? ESCAPE '\\'",
+            [f"%{_escape_like(title_lower)}%"]
         )
         partial_matches = await cursor.fetchall()
         
@@ -938,21 +960,12 @@ async def update_book_status(
                 (book_id,)
             )
             # Renumber remaining sessions to keep sequence continuous
-            cursor = await db.execute(
-                "SELECT id, session_number FROM reading_sessions WHERE title_id = ? ORDER BY session_number",
-                (book_id,)
-            )
-            rows = await cursor.fetchall()
-            for i, row in enumerate(rows, start=1):
-                if row[1] != i:
-                    await db.execute(
-                        "UPDATE reading_sessions SET session_number = ?, updated_at = ? WHERE id = ?",
-                        (i, now, row[0])
-                    )
+            await renumber_sessions(db, book_id, now)
 
     # Recompute the title projection in the same transaction
     await sync_title_from_sessions(db, book_id)
     await db.commit()
+    invalidate_stats_cache()
 
     cursor = await db.execute(
         "SELECT status, rating, date_started, date_finished FROM titles WHERE id = ?",
@@ -1080,6 +1093,7 @@ async def update_book_dates(
         # Recompute the title projection in the same transaction
         await sync_title_from_sessions(db, book_id)
         await db.commit()
+        invalidate_stats_cache()
 
     # No session: nothing can hold dates; return the projected (null)
     # values rather than erroring under the legacy call sequence
@@ -1969,6 +1983,7 @@ async def delete_title(
 
     await db.execute("DELETE FROM titles WHERE id = ?", [book_id])
     await db.commit()
+    invalidate_stats_cache()
 
     return {
         "status": "deleted",
@@ -2492,6 +2507,10 @@ async def bulk_extract_covers(
         'details': []
     }
     
+    # (cover_path, title_id) for every successful extraction, written in one
+    # batch at the end instead of an UPDATE + commit per title
+    extracted_covers = []
+    
     for title in titles:
         results['processed'] += 1
         title_id = title['id']
@@ -2524,13 +2543,7 @@ async def bulk_extract_covers(
         try:
             cover_path = extract_epub_cover(epub_path, title_id)
             if cover_path:
-                # Update database
-                await db.execute("""
-                    UPDATE titles 
-                    SET cover_path = ?, has_cover = 1, cover_source = 'extracted'
-                    WHERE id = ?
-                """, (cover_path, title_id))
-                await db.commit()
+                extracted_covers.append((cover_path, title_id))
                 results['extracted'] += 1
                 results['details'].append({
                     'id': title_id,
@@ -2548,6 +2561,15 @@ async def bulk_extract_covers(
                 'error': str(e)
             })
     
+    # Update database
+    if extracted_covers:
+        async with transaction(db):
+            await db.executemany("""
+                UPDATE titles 
+                SET cover_path = ?, has_cover = 1, cover_source = 'extracted'
+                WHERE id = ?
+            """, extracted_covers)
+    
     return results
 
 
@@ -3156,21 +3178,17 @@ async def merge_titles(
     if target_id == source_id:
         raise HTTPException(status_code=400, detail="Cannot merge a title with itself")
     
-    # Count what we're moving (for response)
-    cursor = await db.execute("SELECT COUNT(*) FROM editions WHERE title_id = ?", (source_id,))
-    editions_count = (await cursor.fetchone())[0]
-    
-    cursor = await db.execute("SELECT COUNT(*) FROM reading_sessions WHERE title_id = ?", (source_id,))
-    sessions_count = (await cursor.fetchone())[0]
-    
-    cursor = await db.execute("SELECT COUNT(*) FROM notes WHERE title_id = ?", (source_id,))
-    notes_count = (await cursor.fetchone())[0]
-    
-    cursor = await db.execute("SELECT COUNT(*) FROM collection_books WHERE title_id = ?", (source_id,))
-    collections_count = (await cursor.fetchone())[0]
-    
-    cursor = await db.execute("SELECT COUNT(*) FROM links WHERE to_title_id = ?", (source_id,))
-    links_count = (await cursor.fetchone())[0]
+    # Count what we're moving (for response) - one round trip, each
+    # subquery served by its table's title index
+    counts = await qone(db, """
+        SELECT
+            (SELECT COUNT(*) FROM editions WHERE title_id = :id),
+            (SELECT COUNT(*) FROM reading_sessions WHERE title_id = :id),
+            (SELECT COUNT(*) FROM notes WHERE title_id = :id),
+            (SELECT COUNT(*) FROM collection_books WHERE title_id = :id),
+            (SELECT COUNT(*) FROM links WHERE to_title_id = :id)
+    """, {"id": source_id})
+    editions_count, sessions_count, notes_count, collections_count, links_count = counts
 
     # --- Files first: trash the source's folder(s) BEFORE any DB write ---
     # Same contract as DELETE /books/{id} (v0.55.0): if a move fails, restore
@@ -3340,6 +3358,7 @@ async def merge_titles(
     await sync_title_from_sessions(db, target_id)
 
     await db.commit()
+    invalidate_stats_cache()
     
     return {
         "success": True,
@@ -3365,6 +3384,10 @@ async def merge_titles(
 # DUPLICATE FINDER
 # =============================================================================
 
+_TITLE_PUNCT_RE = re.compile(r'[^\w\s]')
+_TITLE_SPACES_RE = re.compile(r'\s+')
+
+
 def normalize_title(title: str) -> str:
     """Normalize title for comparison: lowercase, remove articles, punctuation."""
     if not title:
@@ -3377,9 +3400,8 @@ def normalize_title(title: str) -> str:
             normalized = normalized[len(article):]
             break
     # Remove punctuation and extra spaces
-    import re
-    normalized = re.sub(r'[^\w\s]', '', normalized)
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
+    normalized = _TITLE_PUNCT_RE.sub('', normalized)
+    normalized = _TITLE_SPACES_RE.sub(' ', normalized).strip()
     return normalized
 
 
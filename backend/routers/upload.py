@@ -8,6 +8,7 @@ API Endpoints:
 - POST /api/upload/cancel — Cancel session and clean up temp files
 """
 
+import asyncio
 import os
 import json
 import shutil
@@ -20,6 +21,13 @@ from pydantic import BaseModel
 
 from database import get_db
 import aiosqlite
+
+# C++ candidate pruning for the familiar-title check (difflib scores)
+try:
+    from rapidfuzz import fuzz, process as rf_process
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
 from services.covers import generate_cover_colors
 from services.metadata import extract_metadata
 from pathlib import Path
@@ -281,6 +289,46 @@ async def insert_editions_per_format(
 # FAMILIAR TITLE CHECK
 # =============================================================================
 
+# Minimum title similarity (exclusive) for a familiar-title match
+FAMILIAR_TITLE_THRESHOLD = 0.85
+
+
+def _closest_title(title_lower: str, existing_lowers: list[str]) -> Optional[int]:
+    """
+    Index of the best fuzzy match for title_lower, or None.
+    
+    Ties go to the earliest candidate, which keeps owned rows ahead of
+    wishlist twins. Exact matches are resolved by the caller first.
+    
+    The score is difflib's Ratcliff/Obershelp ratio on every install.
+    rapidfuzz's fuzz.ratio (normalized Indel/LCS) never scores lower, so
+    when installed one C++ pass only drops candidates that can't clear
+    the threshold.
+    """
+    from difflib import SequenceMatcher
+    
+    candidates = range(len(existing_lowers))
+    if RAPIDFUZZ_AVAILABLE:
+        # Survivors keep their original order so ties resolve as without
+        # rapidfuzz (the epsilon absorbs float rounding at the threshold)
+        hits = rf_process.extract(
+            title_lower, existing_lowers,
+            scorer=fuzz.ratio,
+            score_cutoff=FAMILIAR_TITLE_THRESHOLD * 100 - 1e-9,
+            limit=None
+        )
+        candidates = sorted(hit[2] for hit in hits)
+    
+    best_index = None
+    best_score = FAMILIAR_TITLE_THRESHOLD
+    for i in candidates:
+        similarity = SequenceMatcher(None, title_lower, existing_lowers[i]).ratio()
+        if similarity > best_score:
+            best_index = i
+            best_score = similarity
+    return best_index
+
+
 async def check_familiar_titles(db, books: list) -> dict:
     """
     Check if any books being uploaded have matching titles in the database.
@@ -289,8 +337,6 @@ async def check_familiar_titles(db, books: list) -> dict:
     This catches cases where a book exists in the library database but the
     folder-based duplicate check didn't find it (e.g., renamed folders).
     """
-    from difflib import SequenceMatcher
-    
     results = {}
     
     # Get all existing titles from database — INCLUDING wishlist rows
@@ -307,6 +353,15 @@ async def check_familiar_titles(db, books: list) -> dict:
     """)
     existing_titles = await cursor.fetchall()
     
+    # Normalize the library side once, not once per uploading book
+    existing_lowers = [existing["title"].lower().strip() for existing in existing_titles]
+    
+    # Exact (case-insensitive) matches are a dict hit; only the rest pay for
+    # fuzzy scoring. setdefault keeps the first - owned - row per title.
+    exact_index = {}
+    for i, existing_lower in enumerate(existing_lowers):
+        exact_index.setdefault(existing_lower, i)
+    
     for book in books:
         # Skip if already marked as duplicate by folder check
         if book.duplicate:
@@ -315,51 +370,28 @@ async def check_familiar_titles(db, books: list) -> dict:
         # Normalize the uploading book's title for comparison
         book_title_lower = book.title.lower().strip()
         
-        best_match = None
-        best_score = 0
+        index = exact_index.get(book_title_lower)
+        if index is None:
+            index = _closest_title(book_title_lower, existing_lowers)
+        if index is None:
+            continue
         
-        for existing in existing_titles:
-            existing_title = existing["title"]
-            existing_title_lower = existing_title.lower().strip()
-            
-            # Check for exact match (case-insensitive)
-            if book_title_lower == existing_title_lower:
-                # Parse authors from JSON
-                try:
-                    authors = json.loads(existing["authors"]) if existing["authors"] else []
-                except:
-                    authors = []
-
-                best_match = FamiliarTitle(
-                    title_id=existing["id"],
-                    title=existing_title,
-                    authors=authors,
-                    category=existing["category"],
-                    is_wishlist=bool(existing["is_tbr"])
-                    or (existing["acquisition_status"] or '') == 'wishlist'
-                )
-                break
-            
-            # Check for high similarity match
-            similarity = SequenceMatcher(None, book_title_lower, existing_title_lower).ratio()
-            if similarity > 0.85 and similarity > best_score:
-                try:
-                    authors = json.loads(existing["authors"]) if existing["authors"] else []
-                except:
-                    authors = []
-
-                best_match = FamiliarTitle(
-                    title_id=existing["id"],
-                    title=existing_title,
-                    authors=authors,
-                    category=existing["category"],
-                    is_wishlist=bool(existing["is_tbr"])
-                    or (existing["acquisition_status"] or '') == 'wishlist'
-                )
-                best_score = similarity
+        existing = existing_titles[index]
         
-        if best_match:
-            results[book.id] = best_match
+        # Parse authors from JSON
+        try:
+            authors = json.loads(existing["authors"]) if existing["authors"] else []
+        except:
+            authors = []
+        
+        results[book.id] = FamiliarTitle(
+            title_id=existing["id"],
+            title=existing["title"],
+            authors=authors,
+            category=existing["category"],
+            is_wishlist=bool(existing["is_tbr"])
+            or (existing["acquisition_status"] or '') == 'wishlist'
+        )
     
     return results
 
@@ -422,9 +454,9 @@ async def analyze_batch(
                 rejected_files=rejected_files,
             )
         
-        # Extract metadata from each file (async for EPUB/PDF extraction)
-        for uploaded_file in uploaded_files:
-            await extract_file_metadata(uploaded_file)
+        # Extract metadata from each file; EPUB/PDF parsing runs on worker
+        # threads, at most EXTRACT_CONCURRENCY files at a time
+        await asyncio.gather(*(extract_file_metadata(f) for f in uploaded_files))
         
         # Group files into books
         books = group_files(uploaded_files)
@@ -14,11 +14,21 @@ import re
 import shutil
 import uuid
 import asyncio
+import hashlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from pathlib import Path
 from dataclasses import dataclass, field
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+# C++ pruning for similarity checks; scores always come from difflib
+try:
+    from rapidfuzz.fuzz import ratio as _rf_ratio
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
 
 # Metadata extraction from EPUB/PDF files
 from services.metadata import extract_metadata as extract_epub_metadata
@@ -40,6 +50,7 @@ class UploadedFile:
     size: int
     extension: str
     metadata: Optional[dict] = None
+    content_digest: Optional[bytes] = None  # BLAKE2b-128 of the bytes (EXTRACTED_EXTENSIONS only)
 
 
 @dataclass
@@ -146,6 +157,18 @@ def cleanup_expired_sessions():
 ALLOWED_EXTENSIONS = set(EXTENSION_TO_FORMAT)
 MAX_FILE_SIZE = 250 * 1024 * 1024  # 250 MB
 
+# Patterns used per file/book during analysis, compiled once at import
+_UNSAFE_FILENAME_RE = re.compile(r'[^\w\-_\. ]')
+_AO3_ID_RE = re.compile(r'^(\d{5,})[\s_-]+(.+)$')
+_SERIES_TITLE_RE = re.compile(r'^\[(.+?)\s+(\d+(?:\.\d+)?)\]\s*(.+)$')
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_AO3_ID_PREFIX_RE = re.compile(r'^\d{5,}[\s_-]')
+_WORK_ID_RE = re.compile(r'work[_\s]*id')
+_FFN_RE = re.compile(r'ffn|fanfiction\.net')
+_USERNAME_RE = re.compile(r'^[a-z0-9_]+$')
+_INVALID_PATH_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+
 
 def validate_file(filename: str, size: int) -> tuple[bool, str]:
     """Validate a file for upload. Returns (is_valid, error_message)"""
@@ -173,19 +196,27 @@ async def save_uploaded_file(session: UploadSession, filename: str, content: byt
     ext = os.path.splitext(filename)[1].lower()
     
     # Use original filename but ensure uniqueness
-    safe_name = re.sub(r'[^\w\-_\. ]', '_', filename)
+    safe_name = _UNSAFE_FILENAME_RE.sub('_', filename)
     temp_path = os.path.join(session.temp_dir, f"{file_id}_{safe_name}")
     
     # Write file
     with open(temp_path, 'wb') as f:
         f.write(content)
     
+    # Only formats whose extraction is cached need a digest. Files can be
+    # up to MAX_FILE_SIZE, so hash on a worker thread (hashlib releases
+    # the GIL) rather than stalling other requests on the event loop.
+    content_digest = None
+    if ext in EXTRACTED_EXTENSIONS:
+        content_digest = await asyncio.to_thread(_content_digest, content)
+    
     uploaded_file = UploadedFile(
         id=file_id,
         original_name=filename,
         temp_path=temp_path,
         size=len(content),
-        extension=ext
+        extension=ext,
+        content_digest=content_digest
     )
     
     session.files.append(uploaded_file)
@@ -196,6 +227,34 @@ async def save_uploaded_file(session: UploadSession, filename: str, content: byt
 # METADATA EXTRACTION
 # =============================================================================
 
+# Extracted EPUB/PDF metadata keyed by (content digest, extension), most
+# recently used last. Re-analyzing the same files (cancel and re-upload)
+# skips reopening and word-counting the archives.
+EXTRACT_CACHE_SIZE = 256
+_extract_cache: OrderedDict[tuple, dict] = OrderedDict()
+
+# Formats with file metadata extraction (and so an extraction cache entry)
+EXTRACTED_EXTENSIONS = ('.epub', '.pdf')
+
+
+def _content_digest(content: bytes) -> bytes:
+    """Extraction cache key for a file's bytes (BLAKE2b-128)."""
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+# Extractions running at once, across all upload sessions. Each one holds a
+# worker thread from the default pool and parses a whole EPUB/PDF in memory,
+# so an unbounded batch could starve the pool and spike memory.
+EXTRACT_CONCURRENCY = 4
+_extract_slots = asyncio.Semaphore(EXTRACT_CONCURRENCY)
+
+
+def _extract_in_thread(file_path: Path) -> dict:
+    """Run the metadata extractor to completion on a worker thread."""
+    # extract_metadata is declared async but does all of its zip/XML work
+    # synchronously, so awaiting it directly would block the event loop
+    return asyncio.run(extract_epub_metadata(file_path))
+
+
 async def extract_file_metadata(uploaded_file: UploadedFile) -> dict:
     """
     Extract metadata from an uploaded file.
@@ -208,10 +267,20 @@ async def extract_file_metadata(uploaded_file: UploadedFile) -> dict:
     metadata = parse_filename(uploaded_file.original_name)
     
     # Try to extract richer metadata from EPUB/PDF files
-    if uploaded_file.extension in ('.epub', '.pdf'):
+    if uploaded_file.extension in EXTRACTED_EXTENSIONS:
         try:
-            file_path = Path(uploaded_file.temp_path)
-            extracted = await extract_epub_metadata(file_path)
+            cache_key = (uploaded_file.content_digest, uploaded_file.extension)
+            extracted = _extract_cache.get(cache_key) if uploaded_file.content_digest else None
+            if extracted is not None:
+                _extract_cache.move_to_end(cache_key)
+            else:
+                file_path = Path(uploaded_file.temp_path)
+                async with _extract_slots:
+                    extracted = await asyncio.to_thread(_extract_in_thread, file_path)
+                if uploaded_file.content_digest:
+                    _extract_cache[cache_key] = extracted
+                    if len(_extract_cache) > EXTRACT_CACHE_SIZE:
+                        _extract_cache.popitem(last=False)
             
             # Merge extracted data (prefer extracted over filename-parsed)
             if extracted.get('title'):
@@ -228,7 +297,7 @@ async def extract_file_metadata(uploaded_file: UploadedFile) -> dict:
                 metadata['summary'] = extracted['summary']
             
             if extracted.get('tags'):
-                metadata['tags'] = extracted['tags']
+                metadata['tags'] = list(extracted['tags'])  # cached dict stays untouched
             
             if extracted.get('word_count'):
                 metadata['word_count'] = extracted['word_count']
@@ -261,7 +330,7 @@ def parse_filename(filename: str) -> dict:
     
     # --- Check for AO3 numeric ID pattern first ---
     # Pattern: "12345678_title" or "12345678 - Author - Title"
-    ao3_id_match = re.match(r'^(\d{5,})[\s_-]+(.+)$', name)
+    ao3_id_match = _AO3_ID_RE.match(name)
     if ao3_id_match:
         work_id = ao3_id_match.group(1)
         rest = ao3_id_match.group(2)
@@ -295,7 +364,7 @@ def parse_filename(filename: str) -> dict:
         title_part = parts[1].strip().replace('_', ' ') if len(parts) > 1 else 'Unknown Title'
         
         # Check for series pattern: [Series ##] Title
-        series_match = re.match(r'^\[(.+?)\s+(\d+(?:\.\d+)?)\]\s*(.+)$', title_part)
+        series_match = _SERIES_TITLE_RE.match(title_part)
         if series_match:
             return {
                 'author': author_part,
@@ -338,18 +407,41 @@ def parse_filename(filename: str) -> dict:
 # SMART GROUPING ALGORITHM
 # =============================================================================
 
-def similarity_score(s1: str, s2: str) -> float:
-    """Calculate similarity between two strings (0.0 to 1.0)"""
+def _strip_for_similarity(text: str) -> str:
+    """Normalize for similarity_score: lowercase, remove special chars"""
+    return _NON_WORD_RE.sub('', text.lower())
+
+
+# Grouping and duplicate checks compare every file/book against every other
+# candidate, so the same strings are normalized over and over; both
+# normalizers are pure, so memoize them
+_similarity_key = lru_cache(maxsize=4096)(_strip_for_similarity)
+
+
+def _key_similarity(k1: str, k2: str, cutoff: float = 0.0) -> float:
+    """
+    Similarity (0.0 to 1.0) of two already-normalized strings.
+    
+    The score is difflib's Ratcliff/Obershelp ratio on every install.
+    rapidfuzz's ratio (normalized Indel/LCS) is a different measure that
+    never scores lower, so when installed it only short-circuits pairs
+    that can't reach cutoff; those return 0.0 instead of their exact score.
+    """
+    # The epsilon absorbs float rounding for a score exactly at cutoff
+    if RAPIDFUZZ_AVAILABLE and _rf_ratio(k1, k2) < cutoff * 100 - 1e-9:
+        return 0.0
+    return SequenceMatcher(None, k1, k2).ratio()
+
+
+def similarity_score(s1: str, s2: str, cutoff: float = 0.0) -> float:
+    """Calculate similarity between two strings (0.0 to 1.0); see _key_similarity for cutoff"""
     if not s1 or not s2:
         return 0.0
     
-    # Normalize: lowercase, remove special chars
-    s1 = re.sub(r'[^\w\s]', '', s1.lower())
-    s2 = re.sub(r'[^\w\s]', '', s2.lower())
-    
-    return SequenceMatcher(None, s1, s2).ratio()
+    return _key_similarity(_similarity_key(s1), _similarity_key(s2), cutoff)
 
 
+@lru_cache(maxsize=4096)
 def normalize_for_grouping(text: str) -> str:
     """Normalize text for grouping comparison"""
     if not text:
@@ -358,8 +450,8 @@ def normalize_for_grouping(text: str) -> str:
     # Lowercase, remove extension, remove special chars
     text = os.path.splitext(text)[0]
     text = text.lower()
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = _NON_WORD_RE.sub(' ', text)
+    text = _WHITESPACE_RE.sub(' ', text).strip()
     
     return text
 
@@ -374,8 +466,8 @@ def should_group_together(file1: UploadedFile, file2: UploadedFile, threshold: f
         author1 = file1.metadata.get('author', '')
         author2 = file2.metadata.get('author', '')
         
-        title_sim = similarity_score(title1, title2)
-        author_sim = similarity_score(author1, author2)
+        title_sim = similarity_score(title1, title2, min(threshold, 0.95))
+        author_sim = similarity_score(author1, author2, 0.5)
         
         # High title similarity + reasonable author similarity
         if title_sim >= threshold and author_sim >= 0.5:
@@ -395,7 +487,7 @@ def should_group_together(file1: UploadedFile, file2: UploadedFile, threshold: f
         return True
     
     # Check similarity
-    return similarity_score(name1, name2) >= threshold
+    return similarity_score(name1, name2, threshold) >= threshold
 
 
 def group_files(files: list[UploadedFile]) -> list[BookGroup]:
@@ -482,6 +574,49 @@ def create_book_group(files: list[UploadedFile]) -> BookGroup:
 # CATEGORY AUTO-DETECTION (IMPROVED)
 # =============================================================================
 
+# Keyword tables are built once here rather than on every call
+FANDOM_KEYWORDS = (
+    'drarry', 'dramione', 'wolfstar', 'jily', 'hinny', 'romione',  # Harry Potter
+    'destiel', 'sabriel', 'wincest',  # Supernatural  
+    'stucky', 'stony', 'thorki', 'ironstrange',  # Marvel
+    'johnlock', 'mystrade',  # Sherlock
+    'klance', 'sheith',  # Voltron
+    'sterek', 'stydia',  # Teen Wolf
+    'obikin', 'reylo', 'stormpilot',  # Star Wars
+    'bakudeku', 'tododeku', 'kiribaku',  # My Hero Academia
+    'ereri', 'levihan',  # Attack on Titan
+    'larry', 'ziam',  # One Direction (RPF)
+    'supercorp', 'clexa',  # DC/CW
+    'malec', 'clace',  # Shadowhunters
+    'percabeth', 'solangelo',  # Percy Jackson
+    'nalu', 'gruvia',  # Fairy Tail
+    'sasunaru', 'kakairu',  # Naruto
+)
+
+TROPE_KEYWORDS = (
+    'soulmate', 'soulmates', 'soulbond',
+    'omegaverse', 'alpha', 'omega', 'abo',
+    'enemies to lovers', 'enemies-to-lovers', 'enemies_to_lovers',
+    'fake dating', 'fake-dating', 'fake_dating',
+    'slow burn', 'slow-burn', 'slowburn',
+    'coffee shop', 'coffeeshop', 'coffee_shop',
+    'high school', 'highschool', 'college au',
+    'modern au', 'no powers', 'canon divergent',
+    'fix-it', 'fixit', 'fix_it',
+    'time travel', 'timetravel',
+    'oneshot', 'one-shot', 'one_shot',
+    'pwp', 'smut', 'fluff', 'angst',
+    'hurt comfort', 'hurt-comfort', 'hurtcomfort',
+    'found family',
+    'mpreg',
+    'hanahaki',
+    'wingfic',
+)
+
+NONFICTION_TAGS = ('non-fiction', 'nonfiction', 'biography', 'history',
+                   'science', 'self-help', 'business', 'memoir', 'reference')
+
+
 def detect_fanfiction_from_filename(filename: str, author: str) -> tuple[bool, float, str]:
     """
     Detect if a file is FanFiction based on filename and author patterns.
@@ -497,7 +632,7 @@ def detect_fanfiction_from_filename(filename: str, author: str) -> tuple[bool, f
     # --- HIGH CONFIDENCE: Explicit indicators ---
     
     # AO3 numeric ID at start (e.g., "12345678_story_title.epub")
-    if re.match(r'^\d{5,}[\s_-]', filename):
+    if _AO3_ID_PREFIX_RE.match(filename):
         reasons.append("AO3-style numeric ID in filename")
         confidence += 0.9
     
@@ -512,12 +647,12 @@ def detect_fanfiction_from_filename(filename: str, author: str) -> tuple[bool, f
         confidence += 0.8
     
     # Contains "work_id" pattern
-    if re.search(r'work[_\s]*id', filename_lower):
+    if _WORK_ID_RE.search(filename_lower):
         reasons.append("contains 'work_id'")
         confidence += 0.85
     
     # FFN (FanFiction.net) pattern
-    if re.search(r'ffn|fanfiction\.net', filename_lower):
+    if _FFN_RE.search(filename_lower):
         reasons.append("FanFiction.net indicator")
         confidence += 0.85
     
@@ -545,60 +680,24 @@ def detect_fanfiction_from_filename(filename: str, author: str) -> tuple[bool, f
     
     # --- MEDIUM CONFIDENCE: Username-style author ---
     # AO3 authors often have username patterns: lowercase, underscores, numbers
-    if author and author != 'Unknown':
+    # Cheap shape checks first: long names and "First Last" names can't
+    # match the username pattern, so they skip lowercasing and the regex
+    if author and author != 'Unknown' and len(author) < 25 and ' ' not in author:
         author_lower = author.lower()
         # Check for username patterns
-        if re.match(r'^[a-z0-9_]+$', author_lower) and len(author) < 25:
+        if _USERNAME_RE.match(author_lower):
             reasons.append("username-style author")
             confidence += 0.2
     
     # --- MEDIUM CONFIDENCE: Fandom-specific keywords ---
-    fandom_keywords = [
-        'drarry', 'dramione', 'wolfstar', 'jily', 'hinny', 'romione',  # Harry Potter
-        'destiel', 'sabriel', 'wincest',  # Supernatural  
-        'stucky', 'stony', 'thorki', 'ironstrange',  # Marvel
-        'johnlock', 'mystrade',  # Sherlock
-        'klance', 'sheith',  # Voltron
-        'sterek', 'stydia',  # Teen Wolf
-        'obikin', 'reylo', 'stormpilot',  # Star Wars
-        'bakudeku', 'tododeku', 'kiribaku',  # My Hero Academia
-        'ereri', 'levihan',  # Attack on Titan
-        'larry', 'ziam',  # One Direction (RPF)
-        'supercorp', 'clexa',  # DC/CW
-        'malec', 'clace',  # Shadowhunters
-        'percabeth', 'solangelo',  # Percy Jackson
-        'nalu', 'gruvia',  # Fairy Tail
-        'sasunaru', 'kakairu',  # Naruto
-    ]
-    
-    for keyword in fandom_keywords:
+    for keyword in FANDOM_KEYWORDS:
         if keyword in filename_lower:
             reasons.append(f"fandom keyword: {keyword}")
             confidence += 0.4
             break  # Only count once
     
     # --- MEDIUM CONFIDENCE: Common fanfic tropes in filename ---
-    trope_keywords = [
-        'soulmate', 'soulmates', 'soulbond',
-        'omegaverse', 'alpha', 'omega', 'abo',
-        'enemies to lovers', 'enemies-to-lovers', 'enemies_to_lovers',
-        'fake dating', 'fake-dating', 'fake_dating',
-        'slow burn', 'slow-burn', 'slowburn',
-        'coffee shop', 'coffeeshop', 'coffee_shop',
-        'high school', 'highschool', 'college au',
-        'modern au', 'no powers', 'canon divergent',
-        'fix-it', 'fixit', 'fix_it',
-        'time travel', 'timetravel',
-        'oneshot', 'one-shot', 'one_shot',
-        'pwp', 'smut', 'fluff', 'angst',
-        'hurt comfort', 'hurt-comfort', 'hurtcomfort',
-        'found family',
-        'mpreg',
-        'hanahaki',
-        'wingfic',
-    ]
-    
-    for trope in trope_keywords:
+    for trope in TROPE_KEYWORDS:
         if trope in filename_lower:
             reasons.append(f"trope keyword: {trope}")
             confidence += 0.3
@@ -637,9 +736,7 @@ def detect_category(metadata: dict, filename: str = None) -> tuple[str, float]:
     tags = metadata.get('tags', [])
     if tags:
         tags_lower = [t.lower() for t in tags]
-        nonfiction_tags = ['non-fiction', 'nonfiction', 'biography', 'history', 
-                          'science', 'self-help', 'business', 'memoir', 'reference']
-        for tag in nonfiction_tags:
+        for tag in NONFICTION_TAGS:
             if any(tag in t for t in tags_lower):
                 return "Non-Fiction", 0.6
     
@@ -649,6 +746,9 @@ def detect_category(metadata: dict, filename: str = None) -> tuple[str, float]:
 
 def apply_category_detection(books: list[BookGroup], files: list[UploadedFile]):
     """Apply category detection to all books"""
+    # Index the uploaded files once instead of scanning them per book
+    files_by_id = {f.id: f for f in files}
+    
     for book in books:
         # Get first file's info for detection
         if book.files:
@@ -656,11 +756,8 @@ def apply_category_detection(books: list[BookGroup], files: list[UploadedFile]):
             filename = book.files[0]['name']
             
             # Find the uploaded file to get its metadata
-            metadata = None
-            for f in files:
-                if f.id == file_id:
-                    metadata = f.metadata
-                    break
+            uploaded = files_by_id.get(file_id)
+            metadata = uploaded.metadata if uploaded else None
             
             combined_metadata = {
                 'title': book.title,
@@ -718,6 +815,8 @@ async def check_duplicates(books: list[BookGroup], books_dir: str):
                 ]
                 existing_folders.append({
                     'name': folder_name,
+                    'name_lower': folder_name.lower(),
+                    'name_key': _strip_for_similarity(folder_name),
                     'path': folder_path,
                     'category': category,
                     'files': files_in_folder
@@ -738,6 +837,8 @@ async def check_duplicates(books: list[BookGroup], books_dir: str):
             if files_in_folder:  # Only add if there are book files
                 existing_folders.append({
                     'name': folder_name,
+                    'name_lower': folder_name.lower(),
+                    'name_key': _strip_for_similarity(folder_name),
                     'path': folder_path,
                     'category': None,  # Root level
                     'files': files_in_folder
@@ -760,19 +861,26 @@ def find_duplicate(book: BookGroup, existing_folders: list[dict]) -> Optional[di
         book.title.lower()
     ]
     expected_patterns = [p for p in expected_patterns if p]
+    pattern_keys = [_similarity_key(p) for p in expected_patterns]
     
     for folder in existing_folders:
-        folder_lower = folder['name'].lower()
+        folder_lower = folder['name_lower']
         
-        # Check for match
+        # Check for match: containment either way, else fuzzy similarity.
+        # Folder and pattern keys are normalized once up front (a large
+        # library would churn _similarity_key's cache), and the cheap
+        # substring tests run before any similarity score
         is_match = False
         for pattern in expected_patterns:
-            if similarity_score(folder_lower, pattern) >= 0.85:
-                is_match = True
-                break
             if pattern in folder_lower or folder_lower in pattern:
                 is_match = True
                 break
+        else:
+            folder_key = folder['name_key']
+            for key in pattern_keys:
+                if _key_similarity(folder_key, key, 0.85) >= 0.85:
+                    is_match = True
+                    break
         
         if is_match:
             # Found a matching folder - check what type of duplicate
@@ -817,7 +925,7 @@ def build_folder_name(title: str, author: str, series: str = None, series_number
         if not s:
             return s
         # Remove/replace invalid filesystem characters
-        s = re.sub(r'[<>:"/\\|?*]', '', s)
+        s = _INVALID_PATH_CHARS_RE.sub('', s)
         s = s.strip('. ')
         return s
     